@@ -0,0 +1,190 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from recipes.models import CatalogVersion
+
+FEED_CACHE_PREFIX = 'recipe-feed'
+FEED_VERSION_NAMES = (CatalogVersion.RECIPES, CatalogVersion.ACTIVITY)
+
+
+def increment(key, delta=1):
+    """
+    Increment a counter in the stats cache, creating it when missing.
+
+    Returns:
+        int: The new value of the counter.
+
+    """
+    stats = caches['stats']
+    try:
+        return stats.incr(key, delta)
+    except ValueError:
+        if stats.add(key, delta, timeout=None):
+            return delta
+        return stats.incr(key, delta)
+
+
+def get_feed_cache_stats():
+    """
+    Get the hit, miss and invalidation counters of the feed cache.
+
+    Every bump of a catalog keying the feed invalidates it, so the
+    invalidations are the sum of their versions.
+
+    Returns:
+        dict: The counters and the hit rate.
+
+    """
+    stats = {
+        name: caches['stats'].get(f'{FEED_CACHE_PREFIX}:{name}', 0)
+        for name in ('hits', 'misses')
+    }
+    stats['invalidations'] = sum(CatalogVersion.objects.filter(
+        name__in=FEED_VERSION_NAMES).values_list('version', flat=True))
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0
+    return stats
+
+
+class AnonymousFeedCacheMixin:
+    """
+    Mixin caching list and detail data served to anonymous users.
+
+    Responses are keyed by the host, the normalized query parameters,
+    the recipe for details and the versions of the catalogs rendered
+    by the feed, including the activity behind the favorite and
+    follower counters. The versions are kept in the database, so every
+    write, including bulk writes of management commands, invalidates
+    the cache of every worker, and evicting an entry never brings a
+    stale one back.
+
+    Attributes:
+        feed_version_names (tuple): Catalogs keying cached responses.
+
+    """
+    feed_version_names = FEED_VERSION_NAMES
+
+    def get_feed_versions(self, names):
+        """
+        Get the catalog versions keying a cached response.
+
+        Versions already read by ConditionalGetMixin are reused.
+
+        """
+        versions = getattr(self, 'catalog_versions', {})
+        if not set(names) <= set(versions):
+            versions = dict(CatalogVersion.objects.filter(
+                name__in=names).values_list('name', 'version'))
+        return ':'.join(str(versions.get(name, 0)) for name in names)
+
+    def get_feed_cache_key(self, request):
+        params = '&'.join(
+            f'{name}={",".join(sorted(request.query_params.getlist(name)))}'
+            for name in sorted(request.query_params)
+        )
+        versions = self.get_feed_versions(self.feed_version_names)
+        scope = f'list:{versions}'
+        if self.action == 'retrieve':
+            recipe_id = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+            scope = f'detail:{recipe_id}:{versions}'
+        digest = md5(f'{request.get_host()}?{params}'.encode()).hexdigest()
+        return f'{FEED_CACHE_PREFIX}:{scope}:{digest}'
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        """
+        Serve anonymous requests from the cache, filling it on a miss.
+
+        """
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+        key = self.get_feed_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            increment(f'{FEED_CACHE_PREFIX}:hits')
+            return Response(data)
+        increment(f'{FEED_CACHE_PREFIX}:misses')
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.RECIPE_FEED_CACHE_TIMEOUT)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs)
+
+
+class ConditionalGetMixin:
+    """
+    Mixin answering conditional GETs of list and detail views.
+
+    The ETag is derived from the versions of the catalogs the view
+    renders, the requested URL, the negotiated format and the user,
+    and Last-Modified from the latest version change. Both are
+    checked before the queryset is touched, so an unchanged poll
+    costs a single version lookup. The versions read are kept in
+    catalog_versions for the rest of the request.
+
+    Attributes:
+        version_names (tuple): Catalogs rendered by the view.
+
+    """
+    version_names = ()
+
+    def get_validators(self, request):
+        """
+        Compute the ETag and Last-Modified of the requested resource.
+
+        Returns:
+            tuple: The quoted ETag and the last modification timestamp.
+
+        """
+        versions = sorted(CatalogVersion.objects.filter(
+            name__in=self.version_names
+        ).values_list('name', 'version', 'updated'))
+        self.catalog_versions = {
+            name: version for name, version, _ in versions}
+        key = '|'.join((
+            request.get_full_path(),
+            request.accepted_renderer.format,
+            str(request.user.pk),
+            *(f'{name}:{version}' for name, version, _ in versions),
+        ))
+        last_modified = max(
+            (updated for _, _, updated in versions), default=None)
+        return (
+            f'"{md5(key.encode()).hexdigest()}"',
+            last_modified and last_modified.timestamp()
+        )
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        """
+        Return 304 when the client's copy is current, else render it.
+
+        """
+        etag, last_modified = self.get_validators(request)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,105 @@
+import base64
+import binascii
+import uuid
+
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils import html
+
+BASE64_HEADER = ';base64,'
+BASE64_CHUNK_SIZE = 64 * 1024
+
+
+class StreamingBase64ImageField(Base64ImageField):
+    """
+    Image field accepting base64 strings as well as uploaded files.
+
+    Base64 strings are decoded chunk by chunk straight into a
+    temporary file instead of into one bytes object, so the decoded
+    image never sits in memory next to the request text. Files
+    uploaded as multipart or raw binary are validated as they are.
+
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            return serializers.ImageField.to_internal_value(self, data)
+        if data in self.EMPTY_VALUES:
+            return None
+        if not isinstance(data, str):
+            raise ValidationError(self.INVALID_FILE_MESSAGE)
+        file = self.decode_to_file(data)
+        try:
+            with Image.open(file) as image:
+                extension = image.format.lower()
+        except (OSError, SyntaxError):
+            file.close()
+            raise ValidationError(self.INVALID_FILE_MESSAGE)
+        extension = 'jpg' if extension == 'jpeg' else extension
+        if extension not in self.ALLOWED_TYPES:
+            file.close()
+            raise ValidationError(self.INVALID_TYPE_MESSAGE)
+        file.name = f'{uuid.uuid4()}.{extension}'
+        file.seek(0)
+        return serializers.ImageField.to_internal_value(self, file)
+
+    def decode_to_file(self, data):
+        """
+        Decode a base64 string into a temporary file.
+
+        Whitespace is skipped and the undecoded tail of every chunk is
+        carried over, so chunk boundaries need not align with the
+        four-character base64 groups.
+
+        Parameters:
+            data (str): The base64 string, optionally with a data URI
+            header.
+
+        Returns:
+            TemporaryUploadedFile: The decoded file, rewound.
+
+        """
+        header_end = data.find(BASE64_HEADER)
+        start = header_end + len(BASE64_HEADER) if header_end != -1 else 0
+        file = TemporaryUploadedFile('upload', None, 0, None)
+        carry = ''
+        try:
+            for offset in range(start, len(data), BASE64_CHUNK_SIZE):
+                chunk = carry + ''.join(
+                    data[offset:offset + BASE64_CHUNK_SIZE].split())
+                usable = len(chunk) - len(chunk) % 4
+                file.write(base64.b64decode(chunk[:usable], validate=True))
+                carry = chunk[usable:]
+            if carry:
+                raise binascii.Error('Incorrect padding')
+        except (binascii.Error, ValueError):
+            file.close()
+            raise ValidationError(self.INVALID_FILE_MESSAGE)
+        file.size = file.tell()
+        file.seek(0)
+        return file
+
+
+class CommaSeparatedListField(serializers.ListField):
+    """
+    List field reading query parameters as well as JSON lists.
+
+    Query parameters may be repeated, comma-separated or both, so
+    ?ingredients=1,2&ingredients=3 reads as [1, 2, 3].
+
+    """
+
+    def get_value(self, dictionary):
+        if not html.is_html_input(dictionary):
+            return super().get_value(dictionary)
+        values = [
+            value.strip()
+            for item in dictionary.getlist(self.field_name)
+            for value in item.split(',') if value.strip()
+        ]
+        if not values and self.field_name not in dictionary:
+            return serializers.empty
+        return values
@@ -2,6 +2,7 @@ from django_filters.rest_framework import FilterSet, filters
 from rest_framework.filters import SearchFilter
 
 from recipes.models import Ingredient, Recipe, Tag
+from recipes.search import get_search_backend
 
 
 class IngridientFilter(SearchFilter):
@@ -36,6 +37,9 @@ class RecipeFilter(FilterSet):
         is_in_shopping_cart (filters.NumberFilter): Filter for recipes
         in shopping cart.
 
+        search (filters.CharFilter): Full-text search over names,
+        descriptions and ingredients, ordered by relevance.
+
     Meta:
         model (Recipe): The model to which the filter is applied.
         fields (tuple): The fields on which the filtering is performed,
@@ -50,17 +54,22 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.NumberFilter(
         method='filter_is_in_shopping_cart'
     )
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart',)
+        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart',
+                  'search')
 
-    def filter_is_favorited(self, queryset, value, *args, **kwargs):
+    def filter_is_favorited(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
-            return queryset.filter(favorites__user=self.request.user)
+            return queryset.filter(is_favorited=True)
         return queryset
 
-    def filter_is_in_shopping_cart(self, queryset, value, *args, **kwargs):
+    def filter_is_in_shopping_cart(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
-            return queryset.filter(shopping_list__user=self.request.user)
-        return
+            return queryset.filter(is_in_shopping_cart=True)
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        return get_search_backend().search(queryset, value)
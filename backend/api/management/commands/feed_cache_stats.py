@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.caching import get_feed_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Show hit rate and invalidations of the anonymous recipe cache'
+
+    def handle(self, *args, **options):
+        stats = get_feed_cache_stats()
+        self.stdout.write(
+            f'hits: {stats["hits"]}\n'
+            f'misses: {stats["misses"]}\n'
+            f'hit rate: {stats["hit_rate"]:.1%}\n'
+            f'invalidations: {stats["invalidations"]}'
+        )
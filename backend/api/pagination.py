@@ -1,10 +1,153 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from functools import partial
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (BasePagination, PageNumberPagination,
+                                       _positive_int)
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from users.paginators import CachedCountPaginator
+
+
+class KeysetPagination(BasePagination):
+    """
+        Keyset pagination over a composite ordering.
+
+        The cursor holds the values of every ordering field of the
+        edge row of a page, and the next page is fetched with a
+        row-value comparison on all of them: for ('-pub_date', '-id')
+        that is pub_date < p OR (pub_date = p AND id < i). Rows
+        sharing a publication date are never skipped or repeated,
+        and no OFFSET is used however deep the page.
+
+        Attributes:
+            page_size (int): The default number of items
+            to be included in a page.
+
+            page_size_query_param (str): The query parameter name
+            for specifying the page size.
+
+            ordering (tuple): The fields the pages are ordered by,
+            ending with a unique one.
+        """
+    page_size = 6
+    page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    ordering = ('-pk',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def decode_cursor(self, request):
+        """
+        Decode the position and direction of the requested page.
+
+        Returns:
+            tuple: The ordering values of the edge row and whether
+            the page lies before it, or None for the first page.
+
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            position, reverse = cursor['p'], bool(cursor['r'])
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or (
+                len(position) != len(self.ordering)):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, row, reverse):
+        position = [
+            getattr(row, field.lstrip('-')) for field in self.ordering]
+        cursor = json.dumps({'p': position, 'r': int(reverse)}, default=str)
+        return replace_query_param(
+            self.base_url, self.cursor_query_param,
+            base64.urlsafe_b64encode(cursor.encode()).decode()
+        )
+
+    def get_position_filter(self, position, reverse):
+        """
+        Build the lexicographic comparison with the edge row.
+
+        """
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') != reverse else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor[1]
+        ordering = self.ordering
+        if reverse:
+            ordering = [
+                field[1:] if field.startswith('-') else f'-{field}'
+                for field in ordering
+            ]
+        queryset = queryset.order_by(*ordering)
+        if cursor is not None:
+            queryset = queryset.filter(self.get_position_filter(*cursor))
+        page = list(queryset[:page_size + 1])
+        has_more = len(page) > page_size
+        page = page[:page_size]
+        if reverse:
+            page.reverse()
+        self.has_next = has_more if not reverse else True
+        self.has_previous = has_more if reverse else cursor is not None
+        self.page = page
+        return page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
 
 
 class CustomPagination(PageNumberPagination):
     """
         Custom pagination class for controlling the page size.
 
+        Clients can opt into keyset pagination with ?pagination=cursor,
+        ordered by the view's cursor_ordering, and into a cached total
+        with ?count=cached. The cached total is keyed by the catalog
+        versions the view read, if any, so it changes with them; other
+        views may serve it up to PAGINATION_COUNT_CACHE_TIMEOUT seconds
+        stale. Lists ranked in memory are always paged by number.
+
         Attributes:
             page_size (int): The default number of items
             to be included in a page.
@@ -14,3 +157,29 @@ class CustomPagination(PageNumberPagination):
         """
     page_size = 6
     page_size_query_param = 'limit'
+    mode_query_param = 'pagination'
+    count_query_param = 'count'
+    keyset_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if (request.query_params.get(self.mode_query_param) == 'cursor'
+                and hasattr(queryset, 'order_by')):
+            self.keyset_paginator = KeysetPagination()
+            self.keyset_paginator.ordering = getattr(
+                view, 'cursor_ordering', KeysetPagination.ordering)
+            return self.keyset_paginator.paginate_queryset(
+                queryset, request, view)
+        if request.query_params.get(self.count_query_param) == 'cached':
+            versions = getattr(view, 'catalog_versions', {})
+            self.django_paginator_class = partial(
+                CachedCountPaginator, version=':'.join(
+                    f'{name}{version}'
+                    for name, version in sorted(versions.items())
+                )
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset_paginator is not None:
+            return self.keyset_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
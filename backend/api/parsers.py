@@ -0,0 +1,56 @@
+import json
+import mimetypes
+
+from django.http.multipartparser import MultiPartParserError
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import (DataAndFiles, FileUploadParser,
+                                    MultiPartParser)
+
+
+class MultiPartJSONParser(MultiPartParser):
+    """
+    Multipart parser accepting the non-file fields as one JSON part.
+
+    Nested fields such as ingredients do not fit form fields, so
+    clients may send them as JSON in a part named 'data' next to the
+    image part. Uploaded files are streamed to temporary files by
+    the configured upload handlers.
+
+    """
+    json_field = 'data'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parsed = super().parse(stream, media_type, parser_context)
+        if self.json_field not in parsed.data:
+            return parsed
+        try:
+            data = json.loads(parsed.data[self.json_field])
+        except ValueError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+        if not isinstance(data, dict):
+            raise ParseError('JSON part must be an object')
+        return DataAndFiles(data, parsed.files.dict())
+
+
+class ImageUploadParser(FileUploadParser):
+    """
+    Parser for an image sent as the raw request body.
+
+    The file name is optional; without a Content-Disposition header
+    it is derived from the content type.
+
+    """
+    media_type = 'image/*'
+
+    def get_filename(self, stream, media_type, parser_context):
+        filename = super().get_filename(stream, media_type, parser_context)
+        if filename:
+            return filename
+        extension = mimetypes.guess_extension(media_type.split(';')[0])
+        return f'upload{extension or ""}'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return super().parse(stream, media_type, parser_context)
+        except MultiPartParserError as exc:
+            raise ParseError(str(exc))
@@ -25,4 +25,4 @@ class AuthorPermission(BasePermission):
 
                 """
         return (request.method in SAFE_METHODS
-                or obj.author == request.user)
+                or obj.author_id == request.user.id)
@@ -1,4 +1,5 @@
 from django.conf import settings
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
@@ -6,10 +7,35 @@ from rest_framework import serializers, status
 from rest_framework.exceptions import ValidationError
 from rest_framework.fields import SerializerMethodField
 
+from recipes.images import get_variant_urls
 from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
                             ShoppingCart, Tag)
+from recipes.services import update_shopping_lists
 from users.models import User
 
+from .fields import CommaSeparatedListField, StreamingBase64ImageField
+
+
+def get_followed_author_ids(request):
+    """
+    Get the ids of the authors the requesting user follows.
+
+    The ids are loaded once per request and cached on it, so every
+    serializer rendering users within the request shares one query.
+
+    Args:
+        request: The request being served.
+
+    returns:
+        set: The ids of the followed authors.
+
+    """
+    if not hasattr(request, 'followed_author_ids'):
+        request.followed_author_ids = set(
+            request.user.follower.values_list('author_id', flat=True)
+        )
+    return request.followed_author_ids
+
 
 class UserSerializer(UserSerializer):
     """
@@ -25,7 +51,8 @@ class UserSerializer(UserSerializer):
     class Meta:
         model = User
         fields = ('email', 'id', 'username', 'first_name',
-                  'last_name', 'is_subscribed',)
+                  'last_name', 'is_subscribed', 'recipes_count',
+                  'followers_count', 'following_count')
 
     def get_is_subscribed(self, obj):
         """
@@ -38,10 +65,9 @@ class UserSerializer(UserSerializer):
             bool: True if the user is subscribed, False otherwise.
 
         """
-        if self.context['request'].user.is_authenticated:
-            return obj.following.filter(
-                user=self.context['request'].user
-            ).exists()
+        request = self.context['request']
+        if request.user.is_authenticated:
+            return obj.id in get_followed_author_ids(request)
         return False
 
 
@@ -62,11 +88,10 @@ class SubscribeListSerializer(UserSerializer):
     Serializer class for subscribing to a user.
 
     """
-    recipes_count = SerializerMethodField()
     recipes = SerializerMethodField()
 
     class Meta(UserSerializer.Meta):
-        fields = UserSerializer.Meta.fields + ('recipes_count', 'recipes')
+        fields = UserSerializer.Meta.fields + ('recipes',)
         read_only_fields = ('email', 'username', 'first_name', 'last_name')
 
     def validate(self, data):
@@ -93,25 +118,24 @@ class SubscribeListSerializer(UserSerializer):
             )
         return data
 
-    def get_recipes_count(self, obj):
-        """
-        Get the count of recipes for the user.
-
-        """
-        return obj.recipes.count()
-
     def get_recipes(self, obj):
         """
         Get the user's recipes.
 
         Optionally limit the number of recipes returned
         based on the 'recipes_limit' query parameter.
+        Uses the prefetched limited_recipes when available.
 
         """
-        limit = self.context['request'].query_params.get('recipes_limit')
-        recipes = obj.recipes.all()[:int(
-            limit)] if limit else obj.recipes.all()
-        serializer = RecipeShortSerializer(recipes, many=True, read_only=True)
+        if hasattr(obj, 'limited_recipes'):
+            recipes = obj.limited_recipes
+        else:
+            limit = self.context['request'].query_params.get(
+                'recipes_limit')
+            recipes = obj.recipes.all()[:int(
+                limit)] if limit else obj.recipes.all()
+        serializer = RecipeShortSerializer(
+            recipes, many=True, read_only=True, context=self.context)
         return serializer.data
 
 
@@ -141,7 +165,8 @@ class IngredientRecipeSerializer(serializers.ModelSerializer):
 
     """
     id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all()
+        queryset=Ingredient.objects.all(),
+        source='ingredient'
     )
     name = serializers.ReadOnlyField(source='ingredient.name')
     measurement_unit = serializers.ReadOnlyField(
@@ -153,6 +178,18 @@ class IngredientRecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount',)
 
 
+class IngredientAmountSerializer(serializers.Serializer):
+    """
+    Serializer class for an ingredient reference submitted with a recipe.
+
+    The id is resolved by CreateRecipeSerializer together with the
+    other submitted ingredients.
+
+    """
+    id = serializers.IntegerField()
+    amount = serializers.IntegerField()
+
+
 class RecipeReadSerializer(serializers.ModelSerializer):
     """
     Serializer class for reading recipe details.
@@ -166,14 +203,18 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     image = Base64ImageField(max_length=None)
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients',
-                  'is_favorited', 'is_in_shopping_cart',
-                  'name', 'image', 'text', 'cooking_time'
+                  'is_favorited', 'is_in_shopping_cart', 'favorites_count',
+                  'name', 'image', 'image_variants', 'text', 'cooking_time'
                   )
 
+    def get_image_variants(self, obj):
+        return get_variant_urls(obj, self.context.get('request'))
+
     def get_ingredients(self, obj):
         ingredients = IngredientRecipe.objects.filter(recipe=obj)
         return IngredientRecipeSerializer(ingredients, many=True).data
@@ -182,12 +223,16 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         return obj.favorites.filter(user=request.user).exists()
 
     def get_is_in_shopping_cart(self, obj):
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         return obj.shopping_list.filter(user=request.user).exists()
 
 
@@ -197,13 +242,9 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
 
     """
 
-    ingredients = IngredientRecipeSerializer(many=True)
-    tags = serializers.PrimaryKeyRelatedField(
-        many=True,
-        queryset=Tag.objects.all(),
-        error_messages={'does_not_exist': 'Specified tag does not exist'}
-    )
-    image = Base64ImageField(max_length=None)
+    ingredients = IngredientAmountSerializer(many=True)
+    tags = serializers.ListField(child=serializers.IntegerField())
+    image = StreamingBase64ImageField(max_length=None)
     author = UserSerializer(read_only=True)
     cooking_time = serializers.IntegerField()
     text = serializers.CharField()
@@ -214,12 +255,12 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'tags', 'author', 'ingredients',
                   'name', 'image', 'text', 'cooking_time')
 
-    def validate_tags(self, tags):
-        for tag in tags:
-            if not Tag.objects.filter(id=tag.id).exists():
-                raise serializers.ValidationError(
-                    'Specified tag does not exist')
-        return tags
+    def validate_tags(self, tag_ids):
+        tag_ids = list(dict.fromkeys(tag_ids))
+        tags = Tag.objects.in_bulk(tag_ids)
+        if len(tags) != len(tag_ids):
+            raise serializers.ValidationError('Specified tag does not exist')
+        return [tags[tag_id] for tag_id in tag_ids]
 
     def validate_cooking_time(self, cooking_time):
         if cooking_time < settings.ONE_MINUTE:
@@ -237,12 +278,12 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         if not ingredients:
             raise serializers.ValidationError('Ingredients are missing')
         for ingredient in ingredients:
-            ingredient_id = ingredient.get('id')
+            ingredient_id = ingredient['id']
             if ingredient_id in ingredient_ids:
                 raise serializers.ValidationError('Ingredients must be unique')
             ingredient_ids.add(ingredient_id)
-            amount = ingredient.get('amount')
-            if amount is not None and int(amount) < settings.ONE_INGREDIENT:
+            amount = ingredient['amount']
+            if amount < settings.ONE_INGREDIENT:
                 raise serializers.ValidationError(
                     'Ingredient amount must be greater than 0'
                 )
@@ -250,6 +291,12 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError(
                     'Ingredient amount must be smaller than 32000'
                 )
+        found = Ingredient.objects.in_bulk(ingredient_ids)
+        if len(found) != len(ingredient_ids):
+            raise serializers.ValidationError(
+                'Specified ingredient does not exist')
+        for ingredient in ingredients:
+            ingredient['ingredient'] = found[ingredient['id']]
         return ingredients
 
     @staticmethod
@@ -257,66 +304,201 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         ingredient_list = []
         for ingredient_data in ingredients:
             ingredient = IngredientRecipe(
-                ingredient=ingredient_data['id'],
+                ingredient=ingredient_data['ingredient'],
                 amount=ingredient_data['amount'],
                 recipe=recipe,
             )
             ingredient_list.append(ingredient)
         IngredientRecipe.objects.bulk_create(ingredient_list)
 
+    @transaction.atomic
     def create(self, validated_data):
         request = self.context.get('request', None)
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(author=request.user, **validated_data)
-        recipe.tags.set(tags)
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=tag) for tag in tags)
         self.create_ingredients(recipe, ingredients)
         return recipe
 
-    def update(self, instance, validated_data):
-        instance.image = validated_data.get('image', instance.image)
-        instance.cooking_time = validated_data.get(
-            'cooking_time', instance.cooking_time)
-        instance.name = validated_data.get('name', instance.name)
-        instance.text = validated_data.get('text', instance.text)
-        instance.save()
-
-        instance.ingredients.clear()
-        ingredients = validated_data.get('ingredients')
-        if ingredients:
-            for ingredient_data in ingredients:
-                ingredient_id = ingredient_data.get('id')
-                amount = ingredient_data.get('amount')
-                delete = ingredient_data.get('delete', False)
-                if ingredient_id:
-                    ingredient = Ingredient.objects.get(id=ingredient_id.id)
-                    if delete:
-                        instance.ingredients.remove(ingredient)
-                    else:
-                        instance.ingredients.add(
-                            ingredient, through_defaults={'amount': amount})
-
-        tags = validated_data.get('tags')
-        if tags:
-            instance.tags.set(tags)
+    @staticmethod
+    def update_ingredients(recipe, ingredients):
+        """
+        Apply the difference between the stored and submitted ingredients.
+
+        New ingredients are inserted, changed amounts updated and
+        dropped ingredients deleted, one bulk statement each, and the
+        carts holding the recipe are adjusted by the same difference.
 
+        Parameters:
+            recipe (Recipe): The edited recipe.
+            ingredients (list): The validated ingredient dicts.
+
+        """
+        stored = {
+            item.ingredient_id: item
+            for item in recipe.ingredient_to_recipe.all()
+        }
+        old_amounts = {
+            ingredient_id: item.amount
+            for ingredient_id, item in stored.items()
+        }
+        new_amounts = {
+            ingredient_data['ingredient'].id: ingredient_data['amount']
+            for ingredient_data in ingredients
+        }
+        created = [
+            IngredientRecipe(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount)
+            for ingredient_id, amount in new_amounts.items()
+            if ingredient_id not in stored
+        ]
+        updated = []
+        for ingredient_id, item in stored.items():
+            amount = new_amounts.get(ingredient_id)
+            if amount is not None and amount != item.amount:
+                item.amount = amount
+                updated.append(item)
+        deleted = [
+            item.pk for ingredient_id, item in stored.items()
+            if ingredient_id not in new_amounts
+        ]
+        IngredientRecipe.objects.bulk_create(created)
+        IngredientRecipe.objects.bulk_update(updated, ('amount',))
+        if deleted:
+            IngredientRecipe.objects.filter(pk__in=deleted).delete()
+        update_shopping_lists(recipe, old_amounts, new_amounts)
+
+    @staticmethod
+    def update_tags(recipe, tags):
+        """
+        Add and remove only the tags that changed.
+
+        """
+        stored = set(recipe.tags.values_list('id', flat=True))
+        submitted = {tag.id for tag in tags}
+        if stored - submitted:
+            recipe.tags.remove(*(stored - submitted))
+        if submitted - stored:
+            recipe.tags.add(*(submitted - stored))
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        # Saving with an empty update_fields would skip the post_save
+        # signals that invalidate the cached recipe, so an edit of the
+        # ingredients or tags alone saves the whole row.
+        instance.save(update_fields=list(validated_data) or None)
+        if ingredients is not None:
+            self.update_ingredients(instance, ingredients)
+        if tags is not None:
+            self.update_tags(instance, tags)
         return instance
 
     def to_representation(self, instance):
+        request = self.context.get('request')
+        instance = Recipe.objects.for_read(request.user).get(pk=instance.pk)
         return RecipeReadSerializer(instance, context={
-            'request': self.context.get('request')
+            'request': request
         }).data
 
 
+class RecipeImageSerializer(serializers.ModelSerializer):
+    """
+    Serializer class for replacing the image of a recipe.
+
+    """
+    image = StreamingBase64ImageField(max_length=None)
+
+    class Meta:
+        model = Recipe
+        fields = ('image',)
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """
+    Serializer class for a list of recipe ids sent to bulk actions.
+
+    """
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=settings.MAX_BULK_RECIPES
+    )
+
+
+class CookWithSerializer(serializers.Serializer):
+    """
+    Serializer class for the ingredients sent to the cook-with search.
+
+    """
+    ingredients = CommaSeparatedListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=settings.MAX_COOK_WITH_INGREDIENTS
+    )
+    include = CommaSeparatedListField(
+        child=serializers.IntegerField(),
+        required=False,
+        max_length=settings.MAX_COOK_WITH_INGREDIENTS
+    )
+    exclude = CommaSeparatedListField(
+        child=serializers.IntegerField(),
+        required=False,
+        max_length=settings.MAX_COOK_WITH_INGREDIENTS
+    )
+
+
+class CookWithRecipeSerializer(RecipeReadSerializer):
+    """
+    Serializer class for a recipe ranked by the cook-with search.
+
+    Attributes:
+        available_ingredients (int): The recipe's ingredients the
+        user has.
+        missing_ingredients (int): The recipe's ingredients the
+        user lacks.
+
+    """
+    available_ingredients = serializers.IntegerField(read_only=True)
+    missing_ingredients = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeReadSerializer.Meta):
+        fields = RecipeReadSerializer.Meta.fields + (
+            'available_ingredients', 'missing_ingredients')
+
+
 class RecipeShortSerializer(serializers.ModelSerializer):
     """
     Serializer class for representing a short version of a recipe.
 
     """
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
+
+    def get_image_variants(self, obj):
+        return get_variant_urls(obj, self.context.get('request'))
+
+
+class SimilarRecipeSerializer(RecipeShortSerializer):
+    """
+    Serializer class for a recipe listed as similar to another one.
+
+    Attributes:
+        score (float): The cosine similarity of the two recipes.
+
+    """
+    score = serializers.FloatField(read_only=True)
+
+    class Meta(RecipeShortSerializer.Meta):
+        fields = RecipeShortSerializer.Meta.fields + ('score',)
 
 
 class FavoriteSerializer(serializers.ModelSerializer):
@@ -0,0 +1,195 @@
+import csv
+import io
+import json
+import os
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+
+try:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen import canvas
+except ImportError:
+    canvas = None
+
+PDF_FONT_NAME = 'ShoppingListFont'
+PDF_MARGIN = 50
+PDF_LINE_HEIGHT = 18
+PDF_FONT_SIZE = 12
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """
+    Base renderer used to negotiate the shopping list format.
+
+    The list itself is streamed by the view, so the renderer only
+    has to encode error responses.
+
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, (bytes, str)):
+            return data
+        return json.dumps(data, ensure_ascii=False).encode()
+
+
+class TextShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class CsvShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class JsonShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+
+class PdfShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+
+SHOPPING_LIST_RENDERERS = (
+    TextShoppingListRenderer,
+    CsvShoppingListRenderer,
+    JsonShoppingListRenderer,
+)
+if canvas is not None:
+    SHOPPING_LIST_RENDERERS += (PdfShoppingListRenderer,)
+
+
+def get_row(ingredient):
+    """
+    Get the name, measurement unit and amount of a list entry.
+
+    """
+    return (
+        ingredient['ingredient__name'],
+        ingredient['ingredient__measurement_unit'],
+        ingredient['amount'],
+    )
+
+
+def render_txt(ingredients):
+    yield 'Shopping List:\n'
+    for ingredient in ingredients:
+        name, measurement_unit, amount = get_row(ingredient)
+        yield f'{name} ({measurement_unit}) - {amount}\n'
+
+
+class LineBuffer:
+    """
+    File-like object handing back whatever csv.writer writes.
+
+    """
+
+    def write(self, value):
+        return value
+
+
+def render_csv(ingredients):
+    writer = csv.writer(LineBuffer())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for ingredient in ingredients:
+        yield writer.writerow(get_row(ingredient))
+
+
+def render_json(ingredients):
+    separator = ''
+    yield '['
+    for ingredient in ingredients:
+        name, measurement_unit, amount = get_row(ingredient)
+        yield separator + json.dumps({
+            'name': name,
+            'measurement_unit': measurement_unit,
+            'amount': amount,
+        }, ensure_ascii=False)
+        separator = ','
+    yield ']'
+
+
+def get_pdf_font():
+    """
+    Register the TrueType font with Cyrillic glyphs if it is available.
+
+    Returns:
+        str: The name of the font to draw the list with.
+
+    """
+    if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return PDF_FONT_NAME
+    if os.path.exists(settings.SHOPPING_LIST_PDF_FONT):
+        pdfmetrics.registerFont(
+            TTFont(PDF_FONT_NAME, settings.SHOPPING_LIST_PDF_FONT))
+        return PDF_FONT_NAME
+    return 'Helvetica'
+
+
+def render_pdf(ingredients):
+    """
+    Draw the list on A4 pages.
+
+    PDF keeps its cross-reference table at the end of the file, so
+    the document is built first and then streamed in chunks.
+
+    """
+    buffer = io.BytesIO()
+    font = get_pdf_font()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    _, height = A4
+    pdf.setFont(font, PDF_FONT_SIZE)
+    position = height - PDF_MARGIN
+    pdf.drawString(PDF_MARGIN, position, 'Shopping List:')
+    for ingredient in ingredients:
+        position -= PDF_LINE_HEIGHT
+        if position < PDF_MARGIN:
+            pdf.showPage()
+            pdf.setFont(font, PDF_FONT_SIZE)
+            position = height - PDF_MARGIN
+        name, measurement_unit, amount = get_row(ingredient)
+        pdf.drawString(
+            PDF_MARGIN, position, f'{name} ({measurement_unit}) - {amount}')
+    pdf.save()
+    buffer.seek(0)
+    yield from iter(lambda: buffer.read(STREAM_CHUNK_SIZE), b'')
+
+
+EXPORTERS = {
+    'txt': render_txt,
+    'csv': render_csv,
+    'json': render_json,
+    'pdf': render_pdf,
+}
+
+
+def stream_shopping_list(ingredients, renderer):
+    """
+    Stream the shopping list in the negotiated format.
+
+    Parameters:
+        ingredients (iterable): Rows with the ingredient name,
+        measurement unit and total amount.
+        renderer (ShoppingListRenderer): The accepted renderer.
+
+    Returns:
+        StreamingHttpResponse: The response streaming the list file.
+
+    """
+    content_type = renderer.media_type
+    if renderer.charset:
+        content_type = f'{content_type}; charset={renderer.charset}'
+    response = StreamingHttpResponse(
+        EXPORTERS[renderer.format](ingredients), content_type=content_type)
+    response['Content-Disposition'] = (
+        f'attachment; filename=shopping_list.{renderer.format}')
+    return response
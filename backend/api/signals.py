@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.models import Ingredient, Tag
+
+from .snapshots import ingredient_snapshot, tag_snapshot
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_snapshot(**kwargs):
+    """
+    Drop the ingredient catalog snapshot when an ingredient changes.
+
+    """
+    ingredient_snapshot.invalidate()
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tag_snapshot(**kwargs):
+    """
+    Drop the tag catalog snapshot when a tag changes.
+
+    """
+    tag_snapshot.invalidate()
@@ -0,0 +1,133 @@
+import gzip
+import threading
+
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+
+from recipes.models import CatalogVersion, Ingredient, Tag
+
+from .serializers import IngredientSerializer, TagSerializer
+
+
+class CatalogSnapshot:
+    """
+    Process-local pre-rendered JSON of a whole catalog.
+
+    The catalog is serialized once into plain and gzipped bytes and
+    tagged with the catalog version it was built from. Requests pass
+    the version they validated against, so the snapshot is rebuilt as
+    soon as any process changes the catalog; signals also drop it
+    when the catalog changes in this process.
+
+    """
+
+    def __init__(self, version_name, model, serializer_class):
+        self.version_name = version_name
+        self.model = model
+        self.serializer_class = serializer_class
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def invalidate(self):
+        """
+        Drop the snapshot so the next request rebuilds it.
+
+        """
+        self._snapshot = None
+
+    def get_version(self):
+        return CatalogVersion.objects.filter(
+            name=self.version_name
+        ).values_list('version', flat=True).first()
+
+    def build(self, version=None):
+        """
+        Serialize the catalog and compress it.
+
+        The version is read before the rows, so a concurrent change
+        leaves the snapshot looking stale rather than current.
+
+        Parameters:
+            version (int): The catalog version, read when omitted.
+
+        Returns:
+            dict: The version, plain and gzipped content.
+
+        """
+        if version is None:
+            version = self.get_version()
+        data = self.serializer_class(
+            self.model.objects.all(), many=True).data
+        content = JSONRenderer().render(data)
+        snapshot = {
+            'version': version,
+            'content': content,
+            'gzip': gzip.compress(content),
+        }
+        with self._lock:
+            self._snapshot = snapshot
+        return snapshot
+
+    def get(self, version):
+        """
+        Get the snapshot of the version, rebuilding it when it is stale.
+
+        Parameters:
+            version (int): The current catalog version.
+
+        """
+        snapshot = self._snapshot
+        if snapshot is None or snapshot['version'] != version:
+            return self.build(version)
+        return snapshot
+
+    def response(self, request, version):
+        """
+        Serve the snapshot, compressed when the client accepts gzip.
+
+        Parameters:
+            request (Request): The HTTP request.
+            version (int): The current catalog version.
+
+        Returns:
+            HttpResponse: The catalog.
+
+        """
+        snapshot = self.get(version)
+        if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+            response = HttpResponse(
+                snapshot['gzip'], content_type='application/json')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(
+                snapshot['content'], content_type='application/json')
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+tag_snapshot = CatalogSnapshot(CatalogVersion.TAGS, Tag, TagSerializer)
+ingredient_snapshot = CatalogSnapshot(
+    CatalogVersion.INGREDIENTS, Ingredient, IngredientSerializer)
+
+
+class CatalogSnapshotMixin:
+    """
+    Mixin serving unfiltered JSON lists from a CatalogSnapshot.
+
+    Must follow ConditionalGetMixin, which answers conditional
+    requests with the version ETag and reads the catalog version
+    the snapshot is checked against.
+
+    Attributes:
+        snapshot (CatalogSnapshot): The snapshot of the view's catalog.
+
+    """
+    snapshot = None
+
+    def list(self, request, *args, **kwargs):
+        if (self.snapshot is not None and not request.query_params
+                and request.accepted_renderer.format == 'json'):
+            return self.snapshot.response(
+                request, self.catalog_versions.get(self.snapshot.version_name))
+        return super().list(request, *args, **kwargs)
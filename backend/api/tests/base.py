@@ -0,0 +1,152 @@
+import shutil
+import tempfile
+
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.snapshots import ingredient_snapshot, tag_snapshot
+from recipes.cook_with_index import cook_with_index
+from recipes.counters import find_drift, recount
+from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
+                            ShoppingCart, Tag)
+from recipes.services import rebuild_shopping_lists
+from users.models import Follow, User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'stats': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'stats',
+    },
+}
+
+SMALL_GIF = (
+    b'GIF89a\x01\x00\x01\x00\x80\x00\x00\xff\xff\xff\x00\x00\x00!'
+    b'\xf9\x04\x01\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00'
+    b'\x00\x02\x02D\x01\x00;'
+)
+
+USERS_COUNT = 12
+TAGS_COUNT = 3
+INGREDIENTS_COUNT = 40
+RECIPES_PER_AUTHOR = 4
+INGREDIENTS_PER_RECIPE = 8
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, CACHES=TEST_CACHES,
+                   RECIPE_IMAGE_WORKERS=0)
+class SeededTestCase(TestCase):
+    """
+    Test case seeded with users, tags, ingredients and recipes.
+
+    Every user authors RECIPES_PER_AUTHOR recipes. The first user
+    follows everyone else, favorites every second recipe and has
+    every third recipe in the shopping cart.
+
+    """
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        # Run the seed's on-commit work, so later bumps are not
+        # skipped as already pending.
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.users = [
+                User.objects.create(
+                    email=f'user{index}@foodgram.ru',
+                    username=f'user{index}',
+                    first_name=f'First{index}',
+                    last_name=f'Last{index}',
+                )
+                for index in range(USERS_COUNT)
+            ]
+            cls.user = cls.users[0]
+            cls.admin = User.objects.create(
+                email='admin@foodgram.ru',
+                username='admin',
+                first_name='Admin',
+                last_name='Admin',
+                is_staff=True,
+            )
+            cls.tags = [
+                Tag.objects.create(
+                    name=f'Tag {index}',
+                    color=f'#00000{index}',
+                    slug=f'tag-{index}',
+                )
+                for index in range(TAGS_COUNT)
+            ]
+            cls.ingredients = [
+                Ingredient.objects.create(
+                    name=f'ingredient {index}', measurement_unit='g')
+                for index in range(INGREDIENTS_COUNT)
+            ]
+            cls.recipes = []
+            for author in cls.users:
+                for index in range(RECIPES_PER_AUTHOR):
+                    recipe = Recipe.objects.create(
+                        author=author,
+                        name=f'{author.username} recipe {index}',
+                        text='Text',
+                        cooking_time=10,
+                        image=SimpleUploadedFile(
+                            'recipe.gif', SMALL_GIF, content_type='image/gif'),
+                    )
+                    recipe.tags.set(cls.tags)
+                    cls.recipes.append(recipe)
+            IngredientRecipe.objects.bulk_create(
+                IngredientRecipe(
+                    recipe=recipe,
+                    ingredient=cls.ingredients[
+                        (position + offset) % INGREDIENTS_COUNT],
+                    amount=offset + 1,
+                )
+                for position, recipe in enumerate(cls.recipes)
+                for offset in range(INGREDIENTS_PER_RECIPE)
+            )
+            Follow.objects.bulk_create(
+                Follow(user=cls.user, author=author)
+                for author in cls.users[1:]
+            )
+            Favorite.objects.bulk_create(
+                Favorite(user=cls.user, recipe=recipe)
+                for recipe in cls.recipes[::2]
+            )
+            ShoppingCart.objects.bulk_create(
+                ShoppingCart(user=cls.user, recipe=recipe)
+                for recipe in cls.recipes[::3]
+            )
+            rebuild_shopping_lists([cls.user.id])
+            recount(Recipe)
+            recount(User)
+
+    def setUp(self):
+        for alias in TEST_CACHES:
+            caches[alias].clear()
+        ingredient_snapshot.invalidate()
+        tag_snapshot.invalidate()
+        cook_with_index.invalidate()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.anonymous_client = APIClient()
+        self.admin_client = APIClient()
+        self.admin_client.force_authenticate(self.admin)
+
+    def assert_counters_consistent(self):
+        for model in (Recipe, User):
+            self.assertFalse(find_drift(model).exists())
+
+    def assert_shopping_list_matches_cart(self):
+        items = dict(self.user.shopping_list_items.values_list(
+            'ingredient_id', 'amount'))
+        rebuild_shopping_lists([self.user.id])
+        self.assertEqual(items, dict(
+            self.user.shopping_list_items.values_list(
+                'ingredient_id', 'amount')))
@@ -0,0 +1,67 @@
+from recipes.models import Favorite
+from users.models import Follow, User
+
+from .base import SeededTestCase
+
+
+class AdminTests(SeededTestCase):
+    """
+    Check the admin changelists and their filters.
+
+    """
+
+    def setUp(self):
+        super().setUp()
+        superuser = User.objects.create_superuser(
+            email='root@foodgram.ru', username='root', password='root',
+            first_name='Root', last_name='Root'
+        )
+        self.client.force_login(superuser)
+
+    def test_changelists(self):
+        for url in (
+            '/admin/recipes/recipe/',
+            f'/admin/recipes/recipe/?author__username={self.user.username}',
+            '/admin/recipes/favorite/',
+            '/admin/recipes/favorite/?recipe=user0',
+            '/admin/recipes/shoppingcart/',
+            '/admin/users/user/',
+            '/admin/users/follow/',
+            '/admin/users/follow/?user__username=user0',
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+        response = self.client.get(
+            '/admin/users/follow/', {'user__username': 'user1'})
+        self.assertEqual(response.context['cl'].result_count, 0)
+
+    def test_reassignment_keeps_counters(self):
+        favorite = Favorite.objects.filter(user=self.user).first()
+        response = self.client.post(
+            f'/admin/recipes/favorite/{favorite.id}/change/',
+            {'user': self.user.id, 'recipe': self.recipes[1].id}
+        )
+        self.assertEqual(response.status_code, 302)
+        follow = Follow.objects.filter(user=self.user).first()
+        response = self.client.post(
+            f'/admin/users/follow/{follow.id}/change/',
+            {'user': self.users[2].id, 'author': self.users[3].id}
+        )
+        self.assertEqual(response.status_code, 302)
+        response = self.client.post(
+            f'/admin/recipes/recipe/{self.recipes[0].id}/change/', {
+                'author': self.users[1].id,
+                'name': 'Moved',
+                'text': 'Text',
+                'cooking_time': 10,
+                'tags': [self.tags[0].id],
+                'ingredient_to_recipe-TOTAL_FORMS': 1,
+                'ingredient_to_recipe-INITIAL_FORMS': 0,
+                'ingredient_to_recipe-MIN_NUM_FORMS': 1,
+                'ingredient_to_recipe-MAX_NUM_FORMS': 1000,
+                'ingredient_to_recipe-0-ingredient': self.ingredients[0].id,
+                'ingredient_to_recipe-0-amount': 1,
+            }
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assert_counters_consistent()
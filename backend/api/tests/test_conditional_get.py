@@ -0,0 +1,36 @@
+from recipes.models import Tag
+
+from .base import SeededTestCase
+
+
+class ConditionalGetTests(SeededTestCase):
+    """
+    Check the ETags of the catalog and recipe endpoints.
+
+    """
+
+    def test_not_modified(self):
+        for url in ('/api/recipes/', f'/api/recipes/{self.recipes[0].id}/',
+                    '/api/tags/', '/api/ingredients/',
+                    f'/api/tags/{self.tags[0].id}/'):
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_snapshot_lists_use_version_etags(self):
+        for url in ('/api/tags/', '/api/ingredients/'):
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etag,
+                    HTTP_ACCEPT_ENCODING='gzip')
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+        etag = self.client.get('/api/tags/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name='New', color='#FFFFFF', slug='new')
+        response = self.client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('New', {tag['name'] for tag in response.json()})
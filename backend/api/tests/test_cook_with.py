@@ -0,0 +1,73 @@
+import base64
+
+from .base import SMALL_GIF, SeededTestCase
+
+
+class CookWithTests(SeededTestCase):
+    """
+    Check ranking recipes by the ingredients at hand.
+
+    """
+
+    def test_cook_with(self):
+        recipe = self.recipes[5]
+        have = list(recipe.ingredients.values_list('id', flat=True))
+        ingredients = ','.join(map(str, have))
+        response = self.client.get(
+            '/api/recipes/cook_with/', {'ingredients': ingredients})
+        best = response.data['results'][0]
+        self.assertEqual(
+            {ingredient['id'] for ingredient in best['ingredients']},
+            set(have)
+        )
+        self.assertEqual(best['available_ingredients'], len(have))
+        self.assertEqual(best['missing_ingredients'], 0)
+        response = self.client.get('/api/recipes/cook_with/', {
+            'ingredients': have[1:],
+            'include': have[0],
+            'exclude': have[-1],
+            'limit': 100,
+        })
+        results = response.data['results']
+        self.assertTrue(results)
+        for item in results:
+            ingredient_ids = {
+                ingredient['id'] for ingredient in item['ingredients']}
+            self.assertIn(have[0], ingredient_ids)
+            self.assertNotIn(have[-1], ingredient_ids)
+            self.assertEqual(
+                item['available_ingredients'],
+                len(ingredient_ids & set(have[:-1]))
+            )
+        coverage = [
+            item['available_ingredients'] / len(item['ingredients'])
+            for item in results
+        ]
+        self.assertEqual(coverage, sorted(coverage, reverse=True))
+        response = self.client.get('/api/recipes/cook_with/')
+        self.assertEqual(response.status_code, 400)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/recipes/', {
+                'ingredients': [
+                    {'id': have[0], 'amount': 1},
+                    {'id': have[1], 'amount': 1},
+                ],
+                'tags': [self.tags[0].id],
+                'image': base64.b64encode(SMALL_GIF).decode(),
+                'name': 'Two ingredients',
+                'text': 'Text',
+                'cooking_time': 5,
+            }, format='json')
+        new_id = response.data['id']
+        response = self.client.get(
+            '/api/recipes/cook_with/', {'ingredients': have[:2]})
+        self.assertEqual(response.data['results'][0]['id'], new_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/recipes/{new_id}/')
+        response = self.client.get(
+            '/api/recipes/cook_with/',
+            {'ingredients': have[:2], 'limit': 100}
+        )
+        self.assertNotIn(
+            new_id, [item['id'] for item in response.data['results']])
@@ -0,0 +1,87 @@
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+
+from recipes.models import Recipe
+from users.models import Follow, User
+
+from .base import RECIPES_PER_AUTHOR, SeededTestCase
+
+
+class CounterTests(SeededTestCase):
+    """
+    Check the denormalized favorite, cart, follower and recipe counters.
+
+    """
+
+    def test_toggles(self):
+        author = User.objects.create(
+            email='new@foodgram.ru', username='new',
+            first_name='New', last_name='Author'
+        )
+        url = f'/api/users/{author.id}/subscribe/'
+        self.client.post(url)
+        author.refresh_from_db()
+        self.assertEqual(author.followers_count, 1)
+        self.client.delete(url)
+        self.assert_counters_consistent()
+        for action in ('favorite', 'shopping_cart'):
+            url = f'/api/recipes/{self.recipes[1].id}/{action}/'
+            with self.subTest(action=action):
+                self.client.post(url)
+                self.assert_counters_consistent()
+                self.client.delete(url)
+                self.assert_counters_consistent()
+
+    def test_bulk_favorite(self):
+        recipe_ids = [recipe.id for recipe in self.recipes[1::2]]
+        response = self.client.post(
+            '/api/recipes/favorite/', {'recipes': recipe_ids}, format='json')
+        self.assertEqual(sorted(response.data['recipes']), recipe_ids)
+        response = self.client.post(
+            '/api/recipes/favorite/remove/',
+            {'recipes': recipe_ids + [self.recipes[0].id]}, format='json'
+        )
+        self.assertEqual(
+            sorted(response.data['recipes']),
+            sorted(recipe_ids + [self.recipes[0].id])
+        )
+        self.assert_counters_consistent()
+        response = self.client.post(
+            '/api/recipes/favorite/', {'recipes': []}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_repair_counters(self):
+        recipe = self.recipes[0]
+        Recipe.objects.filter(pk=recipe.pk).update(favorites_count=7)
+        User.objects.filter(pk=self.user.pk).update(followers_count=3)
+        recipe.name = 'Renamed'
+        recipe.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 7)
+        output = StringIO()
+        call_command('repair_counters', dry_run=True, stdout=output)
+        self.assertIn('Recipes: 1 drifted\n', output.getvalue())
+        self.assertIn('Users: 1 drifted\n', output.getvalue())
+        call_command('repair_counters', stdout=StringIO())
+        self.assert_counters_consistent()
+        response = self.client.get(f'/api/recipes/{recipe.id}/')
+        self.assertEqual(response.data['favorites_count'], 1)
+        self.assertEqual(
+            response.data['author']['recipes_count'], RECIPES_PER_AUTHOR)
+
+    def test_counters_survive_fixture_round_trip(self):
+        fixture = StringIO()
+        call_command('dumpdata', 'users.user', 'users.follow',
+                     'recipes.recipe', 'recipes.favorite',
+                     'recipes.shoppingcart', stdout=fixture)
+        Recipe.objects.all().delete()
+        Follow.objects.all().delete()
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as file:
+            file.write(fixture.getvalue())
+            file.flush()
+            call_command('loaddata', file.name, stdout=StringIO())
+        self.assert_counters_consistent()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.recipes_count, RECIPES_PER_AUTHOR)
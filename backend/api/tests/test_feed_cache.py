@@ -0,0 +1,79 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+
+from recipes.models import CatalogVersion, Ingredient, Recipe
+
+from .base import SeededTestCase
+
+
+class AnonymousFeedCacheTests(SeededTestCase):
+    """
+    Check the cached anonymous recipe list and details.
+
+    """
+
+    def test_cache(self):
+        recipe = self.recipes[0]
+        for url in ('/api/recipes/?limit=6', f'/api/recipes/{recipe.id}/'):
+            with self.subTest(url=url):
+                expected = self.anonymous_client.get(url).data
+                self.assertEqual(self.anonymous_client.get(url).data,
+                                 expected)
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.filter(pk=recipe.pk).update(name='Renamed')
+            Recipe.objects.get(pk=recipe.pk).save()
+        response = self.anonymous_client.get(f'/api/recipes/{recipe.id}/')
+        self.assertEqual(response.data['name'], 'Renamed')
+
+        # Bulk writes of commands send no signals but bump the catalogs.
+        newest = Recipe.objects.first()
+        self.anonymous_client.get('/api/recipes/?limit=6')
+        Recipe.objects.filter(pk=newest.pk).update(name='Imported')
+        Ingredient.objects.filter(pk=self.ingredients[0].pk).update(
+            name='Loaded')
+        CatalogVersion.bump(
+            CatalogVersion.RECIPES, CatalogVersion.INGREDIENTS)
+        response = self.anonymous_client.get('/api/recipes/?limit=6')
+        self.assertEqual(response.data['results'][0]['name'], 'Imported')
+        response = self.anonymous_client.get(f'/api/recipes/{recipe.id}/')
+        self.assertIn('Loaded', {
+            ingredient['name'] for ingredient in response.data['ingredients']})
+        output = StringIO()
+        call_command('feed_cache_stats', stdout=output)
+        self.assertIn('hits: 2\nmisses: 6\n', output.getvalue())
+
+    def test_eviction_serves_current_data(self):
+        recipe = self.recipes[0]
+        url = f'/api/recipes/{recipe.id}/'
+        self.anonymous_client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.name = 'Renamed'
+            recipe.save()
+        cache.clear()
+        response = self.anonymous_client.get(url)
+        self.assertEqual(response.data['name'], 'Renamed')
+        output = StringIO()
+        call_command('feed_cache_stats', stdout=output)
+        self.assertIn('misses: 2\n', output.getvalue())
+
+    def test_counters_follow_activity(self):
+        recipe = self.recipes[5]
+        url = f'/api/recipes/{recipe.id}/'
+        response = self.anonymous_client.get(url)
+        self.assertEqual(response.data['favorites_count'], 0)
+        followers = response.data['author']['followers_count']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'{url}favorite/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/users/{recipe.author_id}/subscribe/')
+        response = self.anonymous_client.get(url)
+        self.assertEqual(response.data['favorites_count'], 1)
+        self.assertEqual(
+            response.data['author']['followers_count'], followers - 1)
+        response = self.anonymous_client.get('/api/recipes/?limit=100')
+        self.assertEqual(next(
+            item['favorites_count'] for item in response.data['results']
+            if item['id'] == recipe.id
+        ), 1)
@@ -0,0 +1,293 @@
+import base64
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from django.conf import settings
+from django.core import serializers
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes.images import run_variant_job, variant_executor
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+CONTENT_NAME = re.compile(
+    r'^recipes/image/([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}\.png$')
+
+
+def make_photo(size=(2400, 1800)):
+    """
+    Make a JPEG photo with EXIF data, rotated by its orientation tag.
+
+    """
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    exif[0x010F] = 'Camera'
+    buffer = io.BytesIO()
+    Image.effect_noise(size, 64).convert('RGB').save(
+        buffer, 'JPEG', exif=exif, quality=95)
+    return buffer.getvalue()
+
+
+def make_png(size=(64, 48)):
+    """
+    Make a small PNG image.
+
+    """
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 100, 50)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, RECIPE_IMAGE_WORKERS=0)
+class ImageVariantTests(TestCase):
+    """
+    Check the image variants generated for recipe images.
+
+    """
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author = User.objects.create(
+            email='author@foodgram.ru', username='author',
+            first_name='First', last_name='Last'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe = Recipe.objects.create(
+                author=self.author, name='Recipe', text='Text',
+                cooking_time=10,
+                image=SimpleUploadedFile(
+                    'photo.jpg', make_photo(), content_type='image/jpeg')
+            )
+
+    def test_variants_fit_their_boxes_and_budgets(self):
+        self.recipe.refresh_from_db()
+        variants = self.recipe.image_variants
+        self.assertEqual(variants['source'], self.recipe.image.name)
+        for name, options in settings.RECIPE_IMAGE_VARIANTS.items():
+            width, height = options['size']
+            variant = variants[name]
+            self.assertLessEqual(variant['width'], width)
+            self.assertLessEqual(variant['height'], height)
+            self.assertGreater(variant['height'], variant['width'])
+            for extension in ('webp', 'jpeg'):
+                with default_storage.open(variant[extension]) as file:
+                    with Image.open(file) as image:
+                        self.assertFalse(image.getexif())
+                        self.assertEqual(
+                            image.size, (variant['width'], variant['height']))
+
+    def test_missing_image_leaves_variants_empty(self):
+        with self.assertLogs('recipes.images', 'WARNING'):
+            with self.captureOnCommitCallbacks(execute=True):
+                recipe = Recipe.objects.create(
+                    author=self.author, name='Legacy', text='Text',
+                    cooking_time=10, image='recipes/image/missing.jpg'
+                )
+        recipe.refresh_from_db()
+        self.assertFalse(recipe.image_variants)
+        fixture = serializers.serialize('json', [recipe])
+        recipe_id = recipe.pk
+        recipe.delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            for item in serializers.deserialize('json', fixture):
+                item.save()
+        self.assertFalse(Recipe.objects.get(pk=recipe_id).image_variants)
+
+    def test_variants_are_exposed(self):
+        response = APIClient().get(f'/api/recipes/{self.recipe.id}/')
+        variants = response.data['image_variants']
+        self.assertEqual(set(variants), set(settings.RECIPE_IMAGE_VARIANTS))
+        self.assertTrue(variants['card']['webp'].startswith('http://'))
+        self.assertTrue(variants['card']['webp'].endswith('.webp'))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, RECIPE_IMAGE_WORKERS=0)
+class ImageUploadTests(TestCase):
+    """
+    Check the base64, multipart and raw binary image uploads.
+
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(
+            email='author@foodgram.ru', username='author',
+            first_name='First', last_name='Last'
+        )
+        cls.tag = Tag.objects.create(
+            name='Tag', color='#000000', slug='tag')
+        cls.ingredient = Ingredient.objects.create(
+            name='ingredient', measurement_unit='g')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+        self.recipe_data = {
+            'tags': [self.tag.id],
+            'ingredients': [{'id': self.ingredient.id, 'amount': 5}],
+            'name': 'Recipe',
+            'text': 'Text',
+            'cooking_time': 10,
+        }
+
+    def assert_created(self, response):
+        self.assertEqual(response.status_code, 201, response.data)
+        recipe = Recipe.objects.get(pk=response.data['id'])
+        with Image.open(recipe.image) as image:
+            self.assertEqual(image.size, (64, 48))
+        self.assertEqual(recipe.ingredients.get(), self.ingredient)
+        return recipe
+
+    def test_base64_upload(self):
+        encoded = base64.encodebytes(make_png()).decode()
+        response = self.client.post('/api/recipes/', {
+            **self.recipe_data,
+            'image': f'data:image/png;base64,{encoded}',
+        }, format='json')
+        recipe = self.assert_created(response)
+        self.assertTrue(recipe.image.name.endswith('.png'))
+
+    def test_invalid_base64_upload(self):
+        for image in ('data:image/png;base64,abc', 'bm90IGFuIGltYWdl'):
+            with self.subTest(image=image):
+                response = self.client.post('/api/recipes/', {
+                    **self.recipe_data, 'image': image}, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('image', response.data)
+
+    def test_multipart_upload(self):
+        response = self.client.post('/api/recipes/', {
+            'data': json.dumps(self.recipe_data),
+            'image': SimpleUploadedFile(
+                'photo.png', make_png(), content_type='image/png'),
+        }, format='multipart')
+        self.assert_created(response)
+
+    def test_identical_uploads_share_a_file(self):
+        names = set()
+        for _ in range(2):
+            recipe = self.assert_created(self.client.post('/api/recipes/', {
+                **self.recipe_data,
+                'image': base64.b64encode(make_png()).decode(),
+            }, format='json'))
+            names.add(recipe.image.name)
+        self.assertEqual(len(names), 1)
+        self.assertRegex(names.pop(), CONTENT_NAME)
+
+    @override_settings(RECIPE_IMAGE_WORKERS=2)
+    def test_variants_are_built_in_background(self):
+        with mock.patch.object(variant_executor, 'submit') as submit:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post('/api/recipes/', {
+                    **self.recipe_data,
+                    'image': base64.b64encode(make_png()).decode(),
+                }, format='json')
+        recipe = self.assert_created(response)
+        submit.assert_called_once_with(run_variant_job, recipe.id)
+        self.assertEqual(recipe.image_variants, {})
+        call_command('build_image_variants', stdout=io.StringIO())
+        response = self.client.get(f'/api/recipes/{recipe.id}/')
+        self.assertEqual(
+            set(response.data['image_variants']),
+            set(settings.RECIPE_IMAGE_VARIANTS)
+        )
+        with mock.patch.object(variant_executor, 'submit') as submit:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.put(
+                    f'/api/recipes/{recipe.id}/image/', make_png((32, 24)),
+                    content_type='image/png'
+                )
+        submit.assert_called_once_with(run_variant_job, recipe.id)
+        response = self.client.get(f'/api/recipes/{recipe.id}/')
+        self.assertEqual(response.data['image_variants'], {})
+
+    def test_concurrent_identical_uploads(self):
+        content = make_png()
+        name = default_storage.save(
+            'recipes/image/a.png', ContentFile(content))
+        saved = []
+        # The other upload passed the existence check before this one
+        # finished writing the file.
+        with mock.patch.object(default_storage, 'exists', return_value=False):
+            thread = threading.Thread(daemon=True, target=lambda: saved.append(
+                default_storage.save('recipes/image/b.png',
+                                     ContentFile(content))))
+            thread.start()
+            thread.join(timeout=5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(saved, [name])
+        with default_storage.open(name) as file:
+            self.assertEqual(file.read(), content)
+        directory = os.path.dirname(default_storage.path(name))
+        self.assertEqual(os.listdir(directory), [os.path.basename(name)])
+
+    def test_unused_media_is_deleted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = self.assert_created(self.client.post('/api/recipes/', {
+                **self.recipe_data,
+                'image': base64.b64encode(make_png()).decode(),
+            }, format='json'))
+        recipe.refresh_from_db()
+        replaced = [recipe.image.name, recipe.image_variants['card']['webp']]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(
+                f'/api/recipes/{recipe.id}/image/', make_png((32, 24)),
+                content_type='image/png'
+            )
+        recipe.refresh_from_db()
+        kept = [recipe.image.name, recipe.image_variants['card']['webp']]
+        call_command('delete_unused_media', stdout=io.StringIO())
+        for name in replaced + kept:
+            self.assertTrue(default_storage.exists(name))
+        call_command('delete_unused_media', '--min-age', '0',
+                     stdout=io.StringIO())
+        for name in replaced:
+            self.assertFalse(default_storage.exists(name))
+        for name in kept:
+            self.assertTrue(default_storage.exists(name))
+
+    def test_raw_upload(self):
+        recipe = self.assert_created(self.client.post('/api/recipes/', {
+            'data': json.dumps(self.recipe_data),
+            'image': SimpleUploadedFile(
+                'photo.png', make_png(), content_type='image/png'),
+        }, format='multipart'))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                f'/api/recipes/{recipe.id}/image/', make_png((32, 24)),
+                content_type='image/png'
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        recipe.refresh_from_db()
+        with Image.open(recipe.image) as image:
+            self.assertEqual(image.size, (32, 24))
+        self.assertEqual(
+            recipe.image_variants['source'], recipe.image.name)
+        other = APIClient()
+        other.force_authenticate(User.objects.create(
+            email='other@foodgram.ru', username='other',
+            first_name='Other', last_name='User'
+        ))
+        response = other.put(
+            f'/api/recipes/{recipe.id}/image/', make_png(),
+            content_type='image/png'
+        )
+        self.assertEqual(response.status_code, 403)
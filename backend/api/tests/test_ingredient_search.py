@@ -0,0 +1,36 @@
+from django.conf import settings
+
+from recipes.models import Ingredient
+
+from .base import SeededTestCase
+
+
+class IngredientSearchTests(SeededTestCase):
+    """
+    Check the ingredient autocomplete.
+
+    """
+
+    def test_search(self):
+        Ingredient.objects.bulk_create([
+            Ingredient(name='Сгущённое молоко', measurement_unit='г'),
+            Ingredient(name='Молоко', measurement_unit='мл'),
+            Ingredient(name='Мука', measurement_unit='г'),
+        ])
+        response = self.client.get('/api/ingredients/', {'name': 'mol'})
+        self.assertEqual(
+            [ingredient['name'] for ingredient in response.data],
+            ['Молоко', 'Сгущённое молоко']
+        )
+        response = self.client.get('/api/ingredients/', {'name': 'ingr'})
+        self.assertEqual(
+            len(response.data), settings.INGREDIENT_SEARCH_LIMIT)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name='Молоко топлёное',
+                                      measurement_unit='мл')
+        response = self.client.get('/api/ingredients/', {'name': 'mol'})
+        self.assertEqual(
+            [ingredient['name'] for ingredient in response.data],
+            ['Молоко', 'Молоко топлёное', 'Сгущённое молоко']
+        )
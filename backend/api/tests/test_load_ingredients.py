@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase
+
+from recipes.models import Ingredient
+
+
+class LoadIngredientsTests(TestCase):
+    """
+    Check that the ingredient loader is idempotent.
+
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def load(self, **options):
+        output = StringIO()
+        call_command('load_ingredients', stdout=output, **options)
+        return output.getvalue()
+
+    def test_csv_and_json_catalogs_match(self):
+        self.load()
+        count = Ingredient.objects.count()
+        with open(settings.BASE_DIR / 'data' / 'ingredients.csv',
+                  encoding='utf-8') as file:
+            self.assertEqual(count, len(set(file.read().splitlines())))
+        output = self.load(
+            path=settings.BASE_DIR / 'data' / 'ingredients.json')
+        self.assertIn('0 created, 0 updated', output)
+        self.assertEqual(Ingredient.objects.count(), count)
+
+    def test_conflicts(self):
+        path = os.path.join(self.directory, 'ingredients.csv')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('name,measurement_unit\nСоль,г\nперец , г\n')
+        self.load(path=path)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('соль,г\nПерец,  г\nсахар,г\n')
+        self.assertIn('1 created, 0 updated, 2 unchanged',
+                      self.load(path=path))
+        self.assertIn('0 created, 2 updated, 1 unchanged',
+                      self.load(path=path, on_conflict='update'))
+        self.assertEqual(
+            sorted(Ingredient.objects.values_list('name', flat=True)),
+            ['Перец', 'сахар', 'соль']
+        )
@@ -0,0 +1,50 @@
+from django.utils import timezone
+
+from recipes.models import Recipe
+
+from .base import SeededTestCase
+
+
+class PaginationTests(SeededTestCase):
+    """
+    Check the keyset and cached count pagination modes.
+
+    """
+
+    def walk(self, url, link):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([recipe['id'] for recipe in response.data['results']])
+            url = response.data[link]
+        return pages
+
+    def test_cursor_pages_through_equal_dates(self):
+        now = timezone.now()
+        Recipe.objects.filter(pk__in=[
+            recipe.pk for recipe in self.recipes[::2]]).update(pub_date=now)
+        expected = list(Recipe.objects.order_by(
+            '-pub_date', '-id').values_list('id', flat=True))
+        pages = self.walk('/api/recipes/?pagination=cursor&limit=5', 'next')
+        self.assertEqual(sum(pages, []), expected)
+        last = self.client.get('/api/recipes/?pagination=cursor&limit=5')
+        while last.data['next']:
+            last = self.client.get(last.data['next'])
+        self.assertIsNotNone(last.data['previous'])
+        self.assertEqual(
+            self.walk(last.data['previous'], 'previous'), pages[-2::-1])
+
+    def test_invalid_cursor(self):
+        for cursor in ('abc', 'eyJwIjogWzFdLCAiciI6IDB9'):
+            with self.subTest(cursor=cursor):
+                response = self.client.get('/api/recipes/', {
+                    'pagination': 'cursor', 'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+
+    def test_cached_count_follows_writes(self):
+        url = '/api/recipes/?count=cached'
+        count = self.client.get(url).data['count']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipes[0].delete()
+        self.assertEqual(self.client.get(url).data['count'], count - 1)
@@ -0,0 +1,405 @@
+import base64
+import re
+from collections import Counter
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from users.models import User
+
+from .base import SMALL_GIF, SeededTestCase
+
+PAGE_SIZES = (1, 6, 30)
+
+MAX_SQL_TIME = 0.5
+
+# Endpoint name: (fixed number of queries, queries per rendered row).
+QUERY_BUDGETS = {
+    'ingredients-list': (2, 0),
+    'ingredients-search': (1, 0),
+    'ingredients-search-cached': (0, 0),
+    'ingredients-detail': (2, 0),
+    'ingredients-list-snapshot': (1, 0),
+    'tags-list': (2, 0),
+    'tags-list-snapshot': (1, 0),
+    'tags-detail': (2, 0),
+    'recipes-list': (6, 0),
+    'recipes-list-anonymous': (5, 0),
+    'recipes-list-filtered': (7, 0),
+    'recipes-list-cursor': (5, 0),
+    'recipes-detail': (5, 0),
+    'recipes-anonymous-cached': (1, 0),
+    'recipes-create': (13, 0),
+    'recipes-update': (20, 0),
+    'not-modified': (1, 0),
+    'users-list': (3, 0),
+    'users-detail': (2, 0),
+    'users-me': (1, 0),
+    'users-subscriptions': (4, 0),
+    'users-subscribe': (11, 0),
+    'users-unsubscribe': (5, 0),
+    'recipes-favorite': (8, 0),
+    'recipes-unfavorite': (4, 0),
+    'recipes-shopping-cart': (11, 0),
+    'recipes-remove-shopping-cart': (9, 0),
+    'recipes-download-shopping-cart': (1, 0),
+    'recipes-bulk-shopping-cart': (9, 0),
+    'recipes-bulk-remove-shopping-cart': (10, 0),
+    'recipes-clear-shopping-cart': (8, 0),
+    'recipes-favorites-to-shopping-cart': (9, 0),
+    'recipes-bulk-favorite': (6, 0),
+    'recipes-bulk-remove-favorite': (7, 0),
+    'admin-changelist': (6, 0),
+    'recipes-search': (6, 0),
+    'recipes-cook-with': (6, 0),
+    'recipes-similar': (1, 0),
+}
+
+SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def normalize_sql(sql):
+    """
+    Replace literal values in the SQL so repeated statements group up.
+
+    """
+    return SQL_LITERALS.sub('?', sql)
+
+
+def format_duplicates(queries):
+    """
+    Render the statements that were executed more than once.
+
+    Parameters:
+        queries (list): Queries captured by CaptureQueriesContext.
+
+    Returns:
+        str: The duplicated statements with their repeat counts.
+
+    """
+    counter = Counter(normalize_sql(query['sql']) for query in queries)
+    duplicates = [
+        f'{count}x {sql}' for sql, count in counter.most_common()
+        if count > 1
+    ]
+    return '\n'.join(duplicates) or 'no duplicated statements'
+
+
+class QueryBudgetTests(SeededTestCase):
+    """
+    Assert the SQL query count and time of every API endpoint.
+
+    Budgets live in QUERY_BUDGETS as a fixed number of queries plus
+    the number of queries allowed per rendered row, so an endpoint
+    that regresses into N+1 fails on the larger page sizes.
+
+    """
+
+    def assert_query_budget(self, name, response_func):
+        """
+        Call the endpoint and check it against its budget.
+
+        Parameters:
+            name (str): The endpoint name in QUERY_BUDGETS.
+            response_func (callable): Performs the request.
+
+        Returns:
+            Response: The response returned by response_func.
+
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = response_func()
+            if response.streaming:
+                response.streamed_content = b''.join(
+                    response.streaming_content)
+        queries = context.captured_queries
+        rows = 0
+        if isinstance(getattr(response, 'data', None), dict):
+            rows = len(response.data.get('results', ()))
+        fixed, per_row = QUERY_BUDGETS[name]
+        max_queries = fixed + per_row * rows
+        sql_time = sum(float(query['time']) for query in queries)
+        self.assertLess(
+            response.status_code, 400,
+            f'{name} returned {response.status_code}'
+        )
+        self.assertLessEqual(
+            len(queries), max_queries,
+            f'{name} ({rows} rows) ran {len(queries)} queries, '
+            f'budget is {max_queries}. Duplicated statements:\n'
+            f'{format_duplicates(queries)}'
+        )
+        self.assertLessEqual(
+            sql_time, MAX_SQL_TIME,
+            f'{name} ({rows} rows) spent {sql_time:.3f}s in SQL, '
+            f'budget is {MAX_SQL_TIME}s'
+        )
+        return response
+
+    def assert_paged_budget(self, name, url, client=None):
+        """
+        Check a paginated endpoint at every size in PAGE_SIZES.
+
+        The limit is appended to the query string of the URL, which
+        the test client would drop if the limit were passed as data.
+
+        """
+        client = client or self.client
+        separator = '&' if '?' in url else '?'
+        for limit in PAGE_SIZES:
+            with self.subTest(endpoint=name, limit=limit):
+                response = self.assert_query_budget(
+                    name,
+                    lambda: client.get(f'{url}{separator}limit={limit}')
+                )
+                self.assertEqual(
+                    len(response.data['results']),
+                    min(limit, response.data['count'])
+                )
+
+    def test_ingredients(self):
+        ingredient = self.ingredients[0]
+        self.assert_query_budget(
+            'ingredients-list', lambda: self.client.get('/api/ingredients/'))
+        self.assert_query_budget(
+            'ingredients-list-snapshot',
+            lambda: self.client.get('/api/ingredients/'))
+        self.assert_query_budget(
+            'ingredients-search',
+            lambda: self.client.get('/api/ingredients/', {'name': 'ingr'}))
+        self.assert_query_budget(
+            'ingredients-search-cached',
+            lambda: self.client.get('/api/ingredients/', {'name': 'ingr'}))
+        self.assert_query_budget(
+            'ingredients-detail',
+            lambda: self.client.get(f'/api/ingredients/{ingredient.id}/'))
+
+    def test_tags(self):
+        tag = self.tags[0]
+        self.assert_query_budget(
+            'tags-list', lambda: self.client.get('/api/tags/'))
+        self.assert_query_budget(
+            'tags-list-snapshot', lambda: self.client.get('/api/tags/'))
+        self.assert_query_budget(
+            'tags-detail', lambda: self.client.get(f'/api/tags/{tag.id}/'))
+
+    def test_recipes(self):
+        recipe = self.recipes[0]
+        self.assert_paged_budget('recipes-list', '/api/recipes/')
+        self.assert_paged_budget(
+            'recipes-list-anonymous', '/api/recipes/',
+            client=self.anonymous_client
+        )
+        self.assert_paged_budget(
+            'recipes-list-filtered',
+            f'/api/recipes/?tags={self.tags[0].slug}&is_favorited=1'
+        )
+        next_url = '/api/recipes/?pagination=cursor&limit=6'
+        while next_url:
+            response = self.assert_query_budget(
+                'recipes-list-cursor', lambda: self.client.get(next_url))
+            next_url = response.data['next']
+        self.assert_query_budget(
+            'recipes-detail',
+            lambda: self.client.get(f'/api/recipes/{recipe.id}/'))
+
+    def test_anonymous_feed_cache(self):
+        recipe = self.recipes[0]
+        for url in ('/api/recipes/?limit=6', f'/api/recipes/{recipe.id}/'):
+            with self.subTest(url=url):
+                expected = self.anonymous_client.get(url).data
+                response = self.assert_query_budget(
+                    'recipes-anonymous-cached',
+                    lambda: self.anonymous_client.get(url)
+                )
+                self.assertEqual(response.data, expected)
+
+    def test_recipe_create(self):
+        ingredients = [
+            {'id': ingredient.id, 'amount': index + 1}
+            for index, ingredient in enumerate(self.ingredients[:30])
+        ]
+        self.assert_query_budget(
+            'recipes-create',
+            lambda: self.client.post('/api/recipes/', {
+                'ingredients': ingredients,
+                'tags': [tag.id for tag in self.tags],
+                'image': base64.b64encode(SMALL_GIF).decode(),
+                'name': 'New recipe',
+                'text': 'Text',
+                'cooking_time': 5,
+            }, format='json')
+        )
+
+    def test_recipe_update(self):
+        ingredients = [
+            {'id': ingredient.id, 'amount': index + 2}
+            for index, ingredient in enumerate(self.ingredients[4:24])
+        ]
+        self.assert_query_budget(
+            'recipes-update',
+            lambda: self.client.patch(
+                f'/api/recipes/{self.recipes[0].id}/',
+                {'ingredients': ingredients, 'tags': [self.tags[0].id]},
+                format='json'
+            )
+        )
+
+    def test_search(self):
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assert_paged_budget(
+            'recipes-search', f'/api/recipes/?search={self.users[3].username}')
+
+    def test_cook_with(self):
+        have = self.recipes[5].ingredients.values_list('id', flat=True)
+        ingredients = ','.join(map(str, have))
+        self.assert_paged_budget(
+            'recipes-cook-with',
+            f'/api/recipes/cook_with/?ingredients={ingredients}'
+        )
+
+    def test_similar_recipes(self):
+        call_command('build_similar_recipes', stdout=StringIO())
+        self.assert_query_budget(
+            'recipes-similar',
+            lambda: self.client.get(
+                f'/api/recipes/{self.recipes[5].id}/similar/')
+        )
+
+    def test_users(self):
+        author = self.users[1]
+        self.assert_paged_budget(
+            'users-list', '/api/users/', client=self.admin_client)
+        self.assert_query_budget(
+            'users-detail',
+            lambda: self.client.get(f'/api/users/{author.id}/'))
+        self.assert_query_budget(
+            'users-me', lambda: self.client.get('/api/users/me/'))
+
+    def test_subscriptions(self):
+        self.assert_paged_budget(
+            'users-subscriptions', '/api/users/subscriptions/')
+        for limit in PAGE_SIZES:
+            with self.subTest(recipes_limit=limit):
+                self.assert_query_budget(
+                    'users-subscriptions',
+                    lambda: self.client.get(
+                        '/api/users/subscriptions/',
+                        {'limit': 6, 'recipes_limit': limit}
+                    )
+                )
+
+    def test_subscribe_toggle(self):
+        author = User.objects.create(
+            email='new@foodgram.ru', username='new',
+            first_name='New', last_name='Author'
+        )
+        url = f'/api/users/{author.id}/subscribe/'
+        self.assert_query_budget(
+            'users-subscribe', lambda: self.client.post(url))
+        self.assert_query_budget(
+            'users-unsubscribe', lambda: self.client.delete(url))
+
+    def test_favorite_toggle(self):
+        url = f'/api/recipes/{self.recipes[1].id}/favorite/'
+        self.assert_query_budget(
+            'recipes-favorite', lambda: self.client.post(url))
+        self.assert_query_budget(
+            'recipes-unfavorite', lambda: self.client.delete(url))
+
+    def test_shopping_cart_toggle(self):
+        url = f'/api/recipes/{self.recipes[1].id}/shopping_cart/'
+        self.assert_query_budget(
+            'recipes-shopping-cart', lambda: self.client.post(url))
+        self.assert_query_budget(
+            'recipes-remove-shopping-cart', lambda: self.client.delete(url))
+
+    def test_bulk_shopping_cart(self):
+        recipe_ids = [recipe.id for recipe in self.recipes[1::3]]
+        self.assert_query_budget(
+            'recipes-bulk-shopping-cart',
+            lambda: self.client.post(
+                '/api/recipes/shopping_cart/',
+                {'recipes': recipe_ids + [self.recipes[0].id, 0]},
+                format='json'
+            )
+        )
+        self.assert_query_budget(
+            'recipes-bulk-remove-shopping-cart',
+            lambda: self.client.post(
+                '/api/recipes/shopping_cart/remove/',
+                {'recipes': recipe_ids[::2]}, format='json'
+            )
+        )
+        self.assert_query_budget(
+            'recipes-favorites-to-shopping-cart',
+            lambda: self.client.post(
+                '/api/recipes/shopping_cart/from_favorites/')
+        )
+        self.assert_query_budget(
+            'recipes-clear-shopping-cart',
+            lambda: self.client.delete('/api/recipes/shopping_cart/')
+        )
+
+    def test_bulk_favorite(self):
+        recipe_ids = [recipe.id for recipe in self.recipes[1::2]]
+        self.assert_query_budget(
+            'recipes-bulk-favorite',
+            lambda: self.client.post(
+                '/api/recipes/favorite/', {'recipes': recipe_ids},
+                format='json'
+            )
+        )
+        self.assert_query_budget(
+            'recipes-bulk-remove-favorite',
+            lambda: self.client.post(
+                '/api/recipes/favorite/remove/',
+                {'recipes': recipe_ids + [self.recipes[0].id]},
+                format='json'
+            )
+        )
+
+    def test_admin_changelists(self):
+        superuser = User.objects.create_superuser(
+            email='root@foodgram.ru', username='root', password='root',
+            first_name='Root', last_name='Root'
+        )
+        self.client.force_login(superuser)
+        for url in (
+            '/admin/recipes/recipe/',
+            f'/admin/recipes/recipe/?author__username={self.user.username}',
+            '/admin/recipes/favorite/',
+            '/admin/recipes/favorite/?recipe=user0',
+            '/admin/recipes/shoppingcart/',
+            '/admin/users/user/',
+            '/admin/users/follow/',
+            '/admin/users/follow/?user__username=user0',
+            '/admin/autocomplete/?term=user&app_label=recipes'
+            '&model_name=recipe&field_name=author',
+        ):
+            with self.subTest(url=url):
+                self.assert_query_budget(
+                    'admin-changelist', lambda: self.client.get(url))
+
+    def test_not_modified(self):
+        for url in ('/api/recipes/', f'/api/recipes/{self.recipes[0].id}/',
+                    '/api/tags/', '/api/ingredients/'):
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                self.assert_query_budget(
+                    'not-modified',
+                    lambda: self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                )
+
+    def test_download_shopping_cart(self):
+        for file_format in ('txt', 'csv', 'json', 'pdf'):
+            with self.subTest(format=file_format):
+                self.assert_query_budget(
+                    'recipes-download-shopping-cart',
+                    lambda: self.client.get(
+                        '/api/recipes/download_shopping_cart/',
+                        {'format': file_format}
+                    )
+                )
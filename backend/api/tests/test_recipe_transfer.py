@@ -0,0 +1,132 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from users.models import User
+
+from .base import SMALL_GIF
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+RECIPES_COUNT = 7
+
+
+def snapshot_recipes():
+    """
+    Describe every recipe by its natural keys, ignoring ids.
+
+    """
+    return sorted(
+        (
+            recipe.author.email, recipe.name, recipe.pub_date,
+            recipe.image.name,
+            tuple(sorted(recipe.tags.values_list('slug', flat=True))),
+            tuple(sorted(recipe.ingredient_to_recipe.values_list(
+                'ingredient__name', 'ingredient__measurement_unit',
+                'amount'))),
+        )
+        for recipe in Recipe.objects.all()
+    )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeTransferTests(TestCase):
+    """
+    Check that exported recipes import back unchanged.
+
+    """
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        tags = [
+            Tag.objects.create(
+                name=f'Tag {index}', color=f'#00000{index}',
+                slug=f'tag-{index}')
+            for index in range(2)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'ingredient {index}', measurement_unit='g')
+            for index in range(3)
+        ]
+        for index in range(RECIPES_COUNT):
+            author = User.objects.get_or_create(
+                email=f'user{index % 3}@foodgram.ru',
+                defaults={'username': f'user{index % 3}'}
+            )[0]
+            recipe = Recipe.objects.create(
+                author=author, name=f'Recipe {index}', text='Text',
+                cooking_time=10,
+                image=SimpleUploadedFile(
+                    'recipe.gif', SMALL_GIF, content_type='image/gif')
+            )
+            recipe.tags.set(tags[:index % 2 + 1])
+            IngredientRecipe.objects.create(
+                recipe=recipe, ingredient=ingredients[index % 3],
+                amount=index + 1)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'recipes.jsonl')
+        call_command('export_recipes', output=self.path, batch_size=3,
+                     embed_images=True, stderr=StringIO())
+        self.expected = snapshot_recipes()
+        Recipe.objects.all().delete()
+        User.objects.all().delete()
+        Tag.objects.all().delete()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_round_trip(self):
+        call_command('import_recipes', self.path, batch_size=3,
+                     stdout=StringIO())
+        self.assertEqual(snapshot_recipes(), self.expected)
+        self.assertEqual(Ingredient.objects.count(), 3)
+
+    def test_resume(self):
+        with open(self.path, encoding='utf-8') as file:
+            lines = file.readlines()
+        lines[4] = lines[4].replace('"name"', '"broken"', 1)
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.writelines(lines)
+        with self.assertRaises(Exception):
+            call_command('import_recipes', self.path, batch_size=2,
+                         stdout=StringIO())
+        self.assertEqual(Recipe.objects.count(), 4)
+        lines[4] = lines[4].replace('"broken"', '"name"', 1)
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.writelines(lines)
+        call_command('import_recipes', self.path, batch_size=2,
+                     stdout=StringIO())
+        self.assertEqual(snapshot_recipes(), self.expected)
+        with open(f'{self.path}.progress') as file:
+            self.assertEqual(json.load(file), RECIPES_COUNT)
+
+    def test_conflicts_stop_the_import(self):
+        for model, fields in (
+            (User, {'email': 'other@foodgram.ru', 'username': 'user1'}),
+            (Tag, {'name': 'Other', 'color': '#000001', 'slug': 'other'}),
+        ):
+            with self.subTest(model=model.__name__):
+                conflict = model.objects.create(**fields)
+                with self.assertRaisesMessage(CommandError, 'already exists'):
+                    call_command('import_recipes', self.path, restart=True,
+                                 stdout=StringIO())
+                self.assertFalse(Recipe.objects.exists())
+                conflict.delete()
+        call_command('import_recipes', self.path, restart=True,
+                     stdout=StringIO())
+        self.assertEqual(snapshot_recipes(), self.expected)
@@ -0,0 +1,73 @@
+import base64
+
+from .base import SMALL_GIF, TAGS_COUNT, SeededTestCase
+
+
+class RecipeWriteTests(SeededTestCase):
+    """
+    Check creating and updating recipes.
+
+    """
+
+    def test_create(self):
+        ingredients = [
+            {'id': ingredient.id, 'amount': index + 1}
+            for index, ingredient in enumerate(self.ingredients[:30])
+        ]
+        response = self.client.post('/api/recipes/', {
+            'ingredients': ingredients,
+            'tags': [tag.id for tag in self.tags],
+            'image': base64.b64encode(SMALL_GIF).decode(),
+            'name': 'New recipe',
+            'text': 'Text',
+            'cooking_time': 5,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['ingredients']), 30)
+        self.assertEqual(len(response.data['tags']), TAGS_COUNT)
+        response = self.client.post('/api/recipes/', {
+            'ingredients': [{'id': 0, 'amount': 1}],
+            'tags': [0],
+            'image': base64.b64encode(SMALL_GIF).decode(),
+            'name': 'New recipe',
+            'text': 'Text',
+            'cooking_time': 5,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {'ingredients', 'tags'})
+
+    def test_update(self):
+        recipe = self.recipes[0]
+        image = recipe.image.name
+        ingredients = [
+            {'id': ingredient.id, 'amount': index + 2}
+            for index, ingredient in enumerate(self.ingredients[4:24])
+        ]
+        response = self.client.patch(
+            f'/api/recipes/{recipe.id}/',
+            {'ingredients': ingredients, 'tags': [self.tags[0].id]},
+            format='json'
+        )
+        self.assertEqual(
+            sorted((item['id'], item['amount'])
+                   for item in response.data['ingredients']),
+            [(item['id'], item['amount']) for item in ingredients]
+        )
+        self.assertEqual(
+            [tag['id'] for tag in response.data['tags']], [self.tags[0].id])
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image.name, image)
+        self.assertEqual(
+            dict(self.user.shopping_list_items.filter(
+                ingredient__in=self.ingredients[4:24]
+            ).values_list('ingredient_id', 'amount')),
+            {
+                item['id']: item['amount'] + sum(
+                    cart_recipe.ingredient_to_recipe.filter(
+                        ingredient_id=item['id']
+                    ).values_list('amount', flat=True).first() or 0
+                    for cart_recipe in self.recipes[3::3]
+                )
+                for item in ingredients
+            }
+        )
@@ -0,0 +1,52 @@
+import base64
+from io import StringIO
+
+from django.core.management import call_command
+
+from recipes.models import Favorite
+
+from .base import SMALL_GIF, SeededTestCase
+
+
+class RecipeSearchTests(SeededTestCase):
+    """
+    Check the full-text recipe search.
+
+    """
+
+    def test_search(self):
+        call_command('rebuild_search_index', stdout=StringIO())
+        author = self.users[3]
+        response = self.client.get('/api/recipes/', {
+            'search': f'{author.username} recipe 2',
+            'tags': [tag.slug for tag in self.tags],
+        })
+        self.assertEqual(
+            response.data['results'][0]['name'], f'{author.username} recipe 2')
+        response = self.client.get('/api/recipes/', {
+            'search': 'recipe', 'is_favorited': 1, 'limit': 100})
+        self.assertEqual(
+            response.data['count'],
+            Favorite.objects.filter(user=self.user).count()
+        )
+        ingredient = self.ingredients[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/recipes/', {
+                'ingredients': [{'id': ingredient.id, 'amount': 1}],
+                'tags': [self.tags[0].id],
+                'image': base64.b64encode(SMALL_GIF).decode(),
+                'name': 'Борщ',
+                'text': 'Свекла и капуста',
+                'cooking_time': 5,
+            }, format='json')
+        recipe_id = response.data['id']
+        for query in ('борщ', 'капуст', ingredient.name):
+            with self.subTest(query=query):
+                response = self.client.get(
+                    '/api/recipes/', {'search': query, 'limit': 100})
+                self.assertIn(recipe_id, [
+                    recipe['id'] for recipe in response.data['results']])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/recipes/{recipe_id}/')
+        response = self.client.get('/api/recipes/', {'search': 'борщ'})
+        self.assertEqual(response.data['count'], 0)
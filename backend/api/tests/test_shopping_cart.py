@@ -0,0 +1,63 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+from recipes.models import Favorite, ShoppingCart
+
+from .base import SeededTestCase
+
+
+class ShoppingCartTests(SeededTestCase):
+    """
+    Check the bulk cart actions and the stored shopping list.
+
+    """
+
+    def test_bulk_actions(self):
+        recipe_ids = [recipe.id for recipe in self.recipes[1::3]]
+        response = self.client.post(
+            '/api/recipes/shopping_cart/',
+            {'recipes': recipe_ids + [self.recipes[0].id, 0]}, format='json'
+        )
+        self.assertEqual(sorted(response.data['recipes']), recipe_ids)
+        self.assert_shopping_list_matches_cart()
+        response = self.client.post(
+            '/api/recipes/shopping_cart/remove/',
+            {'recipes': recipe_ids[::2]}, format='json'
+        )
+        self.assertEqual(sorted(response.data['recipes']), recipe_ids[::2])
+        self.assert_shopping_list_matches_cart()
+        self.client.post('/api/recipes/shopping_cart/from_favorites/')
+        self.assertFalse(Favorite.objects.filter(user=self.user).exclude(
+            recipe__shopping_list__user=self.user).exists())
+        self.assert_shopping_list_matches_cart()
+        self.client.delete('/api/recipes/shopping_cart/')
+        self.assertFalse(self.user.shopping_list.exists())
+        self.assertFalse(self.user.shopping_list_items.exists())
+        self.assert_counters_consistent()
+
+    def test_rebuild_command(self):
+        ShoppingCart.objects.bulk_create([
+            ShoppingCart(user=self.users[1], recipe=self.recipes[0]),
+            ShoppingCart(user=self.user, recipe=self.recipes[1]),
+        ])
+        output = StringIO()
+        call_command('rebuild_shopping_lists', dry_run=True, stdout=output)
+        self.assertEqual(output.getvalue(), 'Shopping lists: 2 drifted\n')
+        call_command('rebuild_shopping_lists', stdout=StringIO())
+        self.assert_shopping_list_matches_cart()
+        output = StringIO()
+        call_command('rebuild_shopping_lists', stdout=output)
+        self.assertIn('0 drifted', output.getvalue())
+
+    def test_download(self):
+        for file_format in ('txt', 'csv', 'json', 'pdf'):
+            with self.subTest(format=file_format):
+                response = self.client.get(
+                    '/api/recipes/download_shopping_cart/',
+                    {'format': file_format}
+                )
+                expected = self.ingredients[0].name.encode()
+                if file_format == 'pdf':
+                    expected = b'%PDF'
+                self.assertIn(expected, b''.join(response.streaming_content))
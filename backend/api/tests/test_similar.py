@@ -0,0 +1,47 @@
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+
+from recipes.models import IngredientRecipe, Recipe
+
+from .base import INGREDIENTS_COUNT, SeededTestCase
+
+
+class SimilarRecipesTests(SeededTestCase):
+    """
+    Check the precomputed similar recipes.
+
+    """
+
+    def test_similar_recipes(self):
+        call_command('build_similar_recipes', stdout=StringIO())
+        recipe = self.recipes[5]
+        twin = self.recipes[5 + INGREDIENTS_COUNT]
+        url = f'/api/recipes/{recipe.id}/similar/'
+        response = self.client.get(url)
+        self.assertEqual(len(response.data), settings.SIMILAR_RECIPES_COUNT)
+        self.assertEqual(response.data[0]['id'], twin.id)
+        self.assertAlmostEqual(response.data[0]['score'], 1.0)
+        scores = [item['score'] for item in response.data]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+        new = Recipe.objects.create(
+            author=self.user, name='Copy', text='Text', cooking_time=5,
+            image=recipe.image.name
+        )
+        new.tags.set(self.tags)
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(recipe=new, ingredient_id=item.ingredient_id,
+                             amount=item.amount)
+            for item in recipe.ingredient_to_recipe.all()
+        )
+        call_command(
+            'build_similar_recipes', missing=True, stdout=StringIO())
+        response = self.client.get(f'/api/recipes/{new.id}/similar/')
+        self.assertEqual(
+            {item['id'] for item in response.data[:2]}, {recipe.id, twin.id})
+        response = self.client.get(url)
+        self.assertEqual(response.data[0]['id'], new.id)
+        response = self.client.get('/api/recipes/0/similar/')
+        self.assertEqual(response.status_code, 404)
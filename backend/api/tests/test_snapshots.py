@@ -0,0 +1,26 @@
+import gzip
+import json
+
+from recipes.models import Tag
+
+from .base import TAGS_COUNT, SeededTestCase
+
+
+class CatalogSnapshotTests(SeededTestCase):
+    """
+    Check the pre-rendered tag and ingredient lists.
+
+    """
+
+    def test_snapshot(self):
+        expected = self.client.get('/api/tags/').json()
+        response = self.client.get(
+            '/api/tags/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content)),
+                         expected)
+        self.assertEqual(len(expected), TAGS_COUNT)
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name='New', color='#FFFFFF', slug='new')
+        self.assertEqual(
+            len(self.client.get('/api/tags/').json()), TAGS_COUNT + 1)
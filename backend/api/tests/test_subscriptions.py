@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from recipes.models import Recipe
+
+from .base import RECIPES_PER_AUTHOR, SeededTestCase
+
+
+class SubscriptionTests(SeededTestCase):
+    """
+    Check the recipes listed under each followed author.
+
+    """
+
+    def test_recipes_are_newest_first(self):
+        # Newer recipes get smaller ids, so ordering by id is caught.
+        now = timezone.now()
+        for recipe in self.recipes:
+            Recipe.objects.filter(pk=recipe.pk).update(
+                pub_date=now - timedelta(minutes=recipe.pk))
+        for limit in (1, 6, 30):
+            with self.subTest(recipes_limit=limit):
+                response = self.client.get(
+                    '/api/users/subscriptions/',
+                    {'limit': 6, 'recipes_limit': limit}
+                )
+                for author in response.data['results']:
+                    newest = list(Recipe.objects.filter(
+                        author_id=author['id']
+                    ).order_by('-pub_date').values_list('id', flat=True))
+                    self.assertEqual(
+                        [recipe['id'] for recipe in author['recipes']],
+                        newest[:min(limit, RECIPES_PER_AUTHOR)]
+                    )
@@ -1,28 +1,44 @@
-from django.db.models import Sum
-from django.http.response import HttpResponse
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+from django.db.models import F, Prefetch, prefetch_related_objects
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import (IsAuthenticated,
+from rest_framework.parsers import FormParser, JSONParser
+from rest_framework.permissions import (SAFE_METHODS, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 
-from recipes.models import (Favorite, Ingredient, IngredientRecipe, Recipe,
-                            ShoppingCart, Tag)
+from recipes.cook_with_index import cook_with_index
+from recipes.ingredient_index import ingredient_index
+from recipes.models import (CatalogVersion, Favorite, Ingredient, Recipe,
+                            ShoppingCart, ShoppingListItem, Tag)
+from recipes.services import (add_to_cart, add_to_favorites,
+                              add_to_shopping_list, copy_favorites_to_cart,
+                              remove_from_cart, remove_from_favorites,
+                              remove_from_shopping_list)
 from users.models import Follow, User
 
+from .caching import AnonymousFeedCacheMixin, ConditionalGetMixin
 from .filters import IngridientFilter, RecipeFilter
 from .pagination import CustomPagination
+from .parsers import ImageUploadParser, MultiPartJSONParser
 from .persmissions import AuthorPermission
-from .serializers import (CreateRecipeSerializer, FavoriteSerializer,
-                          IngredientSerializer, RecipeReadSerializer,
-                          ShoppingCartSerializer, SubscribeListSerializer,
-                          TagSerializer, UserSerializer)
-
-
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+from .serializers import (CookWithRecipeSerializer, CookWithSerializer,
+                          CreateRecipeSerializer, FavoriteSerializer,
+                          IngredientSerializer, RecipeIdsSerializer,
+                          RecipeImageSerializer, RecipeReadSerializer,
+                          ShoppingCartSerializer, SimilarRecipeSerializer,
+                          SubscribeListSerializer, TagSerializer,
+                          UserSerializer)
+from .shopping_list import SHOPPING_LIST_RENDERERS, stream_shopping_list
+from .snapshots import CatalogSnapshotMixin, ingredient_snapshot, tag_snapshot
+
+
+class IngredientViewSet(ConditionalGetMixin, CatalogSnapshotMixin,
+                        viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for retrieving ingredient details.
 
@@ -33,9 +49,28 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = (IngridientFilter,)
     search_fields = ('^name',)
     pagination_class = None
+    version_names = (CatalogVersion.INGREDIENTS,)
+    snapshot = ingredient_snapshot
+
+    def list(self, request, *args, **kwargs):
+        """
+        List ingredients, answering name searches from memory.
 
+        Parameters:
+            request (Request): The HTTP request.
+
+        Returns:
+            Response: The matching ingredients, prefix matches first.
 
-class TagViewSet(viewsets.ModelViewSet):
+        """
+        name = request.query_params.get(IngridientFilter.search_param)
+        if name:
+            return Response(ingredient_index.search(name))
+        return super().list(request, *args, **kwargs)
+
+
+class TagViewSet(ConditionalGetMixin, CatalogSnapshotMixin,
+                 viewsets.ModelViewSet):
     """
     ViewSet for performing CRUD operations on tags.
 
@@ -44,9 +79,12 @@ class TagViewSet(viewsets.ModelViewSet):
     serializer_class = TagSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
     pagination_class = None
+    version_names = (CatalogVersion.TAGS,)
+    snapshot = tag_snapshot
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin, AnonymousFeedCacheMixin,
+                    viewsets.ModelViewSet):
     """
     ViewSet for performing CRUD operations on recipes.
 
@@ -54,9 +92,55 @@ class RecipeViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     serializer_class = CreateRecipeSerializer
     permission_classes = (AuthorPermission,)
+    parser_classes = (JSONParser, FormParser, MultiPartJSONParser)
     pagination_class = CustomPagination
+    cursor_ordering = ('-pub_date', '-id')
     filter_backends = (DjangoFilterBackend,)
-    filter_class = RecipeFilter
+    filterset_class = RecipeFilter
+    version_names = (
+        CatalogVersion.RECIPES, CatalogVersion.TAGS,
+        CatalogVersion.INGREDIENTS, CatalogVersion.ACTIVITY
+    )
+
+    def get_queryset(self):
+        """
+        Return the recipe queryset for the current request.
+
+        Reads use the read-optimized queryset, writes only need the
+        user's flags for filtering.
+
+        Returns:
+            QuerySet: The recipe queryset.
+
+        """
+        if self.request.method in SAFE_METHODS:
+            return Recipe.objects.for_read(self.request.user)
+        return Recipe.objects.annotate_user_flags(self.request.user)
+
+    def save_with_upload(self, serializer):
+        """
+        Save a recipe serializer and close its uploaded image.
+
+        Storage moves the temporary upload file into place, so it is
+        closed here instead of being left to the garbage collector,
+        which would try to delete the moved file.
+
+        Parameters:
+            serializer (Serializer): The validated serializer.
+
+        """
+        try:
+            serializer.save()
+        finally:
+            image = serializer.validated_data.get('image')
+            if isinstance(image, UploadedFile):
+                image.close()
+
+    def perform_create(self, serializer):
+        self.save_with_upload(serializer)
+
+    def perform_update(self, serializer):
+        self.save_with_upload(serializer)
 
     def get_serializer_class(self):
         """
@@ -70,51 +154,135 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeReadSerializer
         return CreateRecipeSerializer
 
-    @staticmethod
-    def send_message(ingredients):
+    @action(
+        detail=True,
+        methods=['PUT'],
+        permission_classes=[IsAuthenticated, AuthorPermission],
+        parser_classes=[ImageUploadParser],
+    )
+    def image(self, request, pk=None):
         """
-        Generate and send a shopping list as a text file.
+        Replace the recipe image with the raw request body.
+
+        The body is streamed to a temporary file by the upload
+        handlers and moved into storage without being loaded whole.
 
         Parameters:
-            ingredients (QuerySet): The ingredients queryset.
+            request (Request): The HTTP request.
+            pk (int): The ID of the recipe.
 
         Returns:
-            HttpResponse: The response containing the shopping list file.
+            Response: The updated recipe.
 
         """
-        shopping_list = ['Shopping List:']
-        for ingredient in ingredients:
-            ingredient_name = ingredient['ingredient__name']
-            measurement_unit = ingredient['ingredient__measurement_unit']
-            amount = ingredient['amount']
-            shopping_list.append(
-                f"{ingredient_name} ({measurement_unit}) - {amount}")
-
-        shopping_list_text = '\n'.join(shopping_list)
-        response = HttpResponse(shopping_list_text, content_type='text/plain')
-        response['Content-Disposition'] = \
-            'attachment; filename=shopping_list.txt'
-        return response
+        recipe = self.get_object()
+        serializer = RecipeImageSerializer(
+            recipe, data={'image': request.data.get('file')})
+        serializer.is_valid(raise_exception=True)
+        self.save_with_upload(serializer)
+        recipe = Recipe.objects.for_read(request.user).get(pk=recipe.pk)
+        return Response(
+            RecipeReadSerializer(recipe, context={'request': request}).data)
 
-    @action(detail=False, methods=['GET'])
+    @action(
+        detail=False,
+        methods=['GET'],
+        permission_classes=[IsAuthenticated],
+        renderer_classes=SHOPPING_LIST_RENDERERS,
+    )
     def download_shopping_cart(self, request):
         """
-        Download the shopping cart as a text file.
+        Download the shopping cart as a file.
+
+        The format is negotiated from the format query parameter or
+        the Accept header: txt (default), csv, json or pdf.
 
         Parameters:
             request (Request): The HTTP request.
 
         Returns:
-            HttpResponse: The response containing the shopping list file.
+            StreamingHttpResponse: The response streaming
+            the shopping list file.
 
         """
-        ingredients = IngredientRecipe.objects.filter(
-            recipe__shopping_list__user=request.user
+        ingredients = ShoppingListItem.objects.filter(
+            user=request.user
         ).order_by('ingredient__name').values(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(amount=Sum('amount'))
+            'ingredient__name', 'ingredient__measurement_unit', 'amount'
+        ).iterator()
+
+        return stream_shopping_list(ingredients, request.accepted_renderer)
+
+    @action(detail=True, methods=('GET',))
+    def similar(self, request, pk):
+        """
+        List the recipes most similar to a recipe.
+
+        The neighbours are precomputed by the build_similar_recipes
+        command and read with a single query on the (recipe, rank)
+        index.
 
-        return self.send_message(ingredients)
+        Parameters:
+            request (Request): The HTTP request.
+            pk (int): The primary key of the recipe.
+
+        Returns:
+            Response: The similar recipes with their scores,
+            most similar first.
+
+        """
+        recipes = list(Recipe.objects.filter(
+            similar_to__recipe_id=pk
+        ).annotate(
+            score=F('similar_to__score')
+        ).order_by('similar_to__rank'))
+        if not recipes:
+            get_object_or_404(Recipe, pk=pk)
+        return Response(SimilarRecipeSerializer(
+            recipes, many=True, context={'request': request}).data)
+
+    @action(detail=False, methods=('GET',), url_path='cook_with')
+    def cook_with(self, request):
+        """
+        Rank recipes by how many of their ingredients the user has.
+
+        The ingredients query parameter lists the ingredient ids the
+        user has; include and exclude list ingredients every result
+        must or must not use. Recipes are ranked by the cook-with
+        index, and only the requested page is loaded from the
+        database.
+
+        Parameters:
+            request (Request): The HTTP request.
+
+        Returns:
+            Response: The paginated ranked recipes with their
+            available and missing ingredient counts.
+
+        """
+        return self.conditional_response(self.cook_with_page, request)
+
+    def cook_with_page(self, request):
+        serializer = CookWithSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        ranking = cook_with_index.search(
+            serializer.validated_data['ingredients'],
+            include=serializer.validated_data.get('include', ()),
+            exclude=serializer.validated_data.get('exclude', ()),
+        )
+        page = self.paginate_queryset(ranking)
+        recipes = Recipe.objects.for_read(request.user).in_bulk(
+            [recipe_id for recipe_id, _, _ in page])
+        results = []
+        for recipe_id, available, total in page:
+            recipe = recipes.get(recipe_id)
+            if recipe is None:
+                continue
+            recipe.available_ingredients = available
+            recipe.missing_ingredients = total - available
+            results.append(recipe)
+        return self.get_paginated_response(CookWithRecipeSerializer(
+            results, many=True, context={'request': request}).data)
 
     @action(
         detail=True,
@@ -142,7 +310,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
         }
         serializer = ShoppingCartSerializer(data=data, context=context)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            serializer.save()
+            add_to_shopping_list(request.user, [recipe.id])
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @shopping_cart.mapping.delete
@@ -158,11 +328,14 @@ class RecipeViewSet(viewsets.ModelViewSet):
             Response: The response indicating the success of the operation.
 
         """
-        get_object_or_404(
+        cart_item = get_object_or_404(
             ShoppingCart,
             user=request.user.id,
             recipe=get_object_or_404(Recipe, id=pk)
-        ).delete()
+        )
+        with transaction.atomic():
+            cart_item.delete()
+            remove_from_shopping_list(request.user, [cart_item.recipe_id])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -190,7 +363,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
         }
         serializer = FavoriteSerializer(data=data, context=context)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @favorite.mapping.delete
@@ -213,6 +387,92 @@ class RecipeViewSet(viewsets.ModelViewSet):
         ).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def get_recipe_ids(self, request):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['recipes']
+
+    @action(
+        detail=False,
+        methods=('POST', 'DELETE'),
+        url_path='shopping_cart',
+        permission_classes=[IsAuthenticated]
+    )
+    def bulk_shopping_cart(self, request):
+        """
+        Add a list of recipes to the shopping cart, or clear the cart.
+
+        Parameters:
+            request (Request): The HTTP request with the recipe ids
+            in 'recipes' for POST.
+
+        Returns:
+            Response: The ids of the recipes added or removed.
+
+        """
+        if request.method == 'DELETE':
+            return Response({'recipes': remove_from_cart(request.user)})
+        added = add_to_cart(request.user, self.get_recipe_ids(request))
+        return Response({'recipes': added}, status=status.HTTP_201_CREATED)
+
+    @action(
+        detail=False,
+        methods=('POST',),
+        url_path='shopping_cart/remove',
+        permission_classes=[IsAuthenticated]
+    )
+    def bulk_remove_shopping_cart(self, request):
+        """
+        Remove a list of recipes from the shopping cart.
+
+        """
+        return Response({'recipes': remove_from_cart(
+            request.user, self.get_recipe_ids(request))})
+
+    @action(
+        detail=False,
+        methods=('POST',),
+        url_path='shopping_cart/from_favorites',
+        permission_classes=[IsAuthenticated]
+    )
+    def favorites_to_shopping_cart(self, request):
+        """
+        Add every favorite recipe to the shopping cart.
+
+        """
+        return Response(
+            {'recipes': copy_favorites_to_cart(request.user)},
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(
+        detail=False,
+        methods=('POST',),
+        url_path='favorite',
+        permission_classes=[IsAuthenticated]
+    )
+    def bulk_favorite(self, request):
+        """
+        Add a list of recipes to favorites.
+
+        """
+        added = add_to_favorites(request.user, self.get_recipe_ids(request))
+        return Response({'recipes': added}, status=status.HTTP_201_CREATED)
+
+    @action(
+        detail=False,
+        methods=('POST',),
+        url_path='favorite/remove',
+        permission_classes=[IsAuthenticated]
+    )
+    def bulk_remove_favorite(self, request):
+        """
+        Remove a list of recipes from favorites.
+
+        """
+        return Response({'recipes': remove_from_favorites(
+            request.user, self.get_recipe_ids(request))})
+
 
 class UserViewSet(UserViewSet):
     """
@@ -222,6 +482,7 @@ class UserViewSet(UserViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     pagination_class = CustomPagination
+    cursor_ordering = ('username',)
 
     @action(
         detail=True,
@@ -249,7 +510,9 @@ class UserViewSet(UserViewSet):
                 author, data=request.data, context={'request': request}
             )
             serializer.is_valid(raise_exception=True)
-            Follow.objects.create(user=user, author=author)
+            with transaction.atomic():
+                Follow.objects.create(user=user, author=author)
+            author.refresh_from_db(fields=author.counter_fields)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if request.method == 'DELETE':
@@ -272,8 +535,17 @@ class UserViewSet(UserViewSet):
 
         """
         user = request.user
-        queryset = User.objects.filter(following__user=user)
+        queryset = User.objects.filter(
+            following__user=user).order_by('username')
         pages = self.paginate_queryset(queryset)
+        recipes = Recipe.objects.filter(author__in=pages)
+        limit = request.query_params.get('recipes_limit')
+        if limit and limit.isdigit():
+            recipes = recipes.limit_per_author(int(limit))
+        prefetch_related_objects(
+            pages,
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes'),
+        )
         serializer = SubscribeListSerializer(
             pages, many=True, context={'request': request}
         )
@@ -1,5 +1,6 @@
 
 import os
+import tempfile
 from pathlib import Path
 
 import dotenv
@@ -150,6 +151,38 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
+# Shared by every worker and management command on the host. The feed
+# cache statistics get a cache of their own, which holds too few keys
+# to ever be culled.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            default=os.path.join(tempfile.gettempdir(), 'foodgram-cache')
+        ),
+    },
+    'stats': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv(
+            'STATS_CACHE_LOCATION',
+            default=os.path.join(tempfile.gettempdir(), 'foodgram-stats')
+        ),
+    },
+}
+
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+DEFAULT_FILE_STORAGE = 'recipes.storage.ContentAddressedStorage'
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
@@ -165,6 +198,62 @@ MAX_COOKING_TIME = 32000
 
 ONE_INGREDIENT = 1
 
+MAX_BULK_RECIPES = 500
+
+INGREDIENT_SEARCH_LIMIT = 30
+
+INGREDIENT_INDEX_TTL = 300
+
+COOK_WITH_INDEX_TTL = 300
+
+COOK_WITH_MAX_RESULTS = 1000
+
+MAX_COOK_WITH_INGREDIENTS = 200
+
+SIMILAR_RECIPES_COUNT = 10
+
+SIMILAR_RECIPES_TAG_WEIGHT = 0.5
+
+SIMILAR_RECIPES_BATCH_SIZE = 256
+
+PAGINATION_COUNT_CACHE_TIMEOUT = 60
+
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100000
+
+RECIPE_FEED_CACHE_TIMEOUT = 300
+
+RECIPE_SEARCH_BACKENDS = {
+    'postgresql': 'recipes.search.PostgresSearchBackend',
+    'sqlite': 'recipes.search.SQLiteSearchBackend',
+}
+
+RECIPE_SEARCH_CONFIG = os.getenv('RECIPE_SEARCH_CONFIG', 'russian')
+
+RECIPE_IMAGE_VARIANTS = {
+    'card': {'size': (480, 360), 'budget': 40 * 1024},
+    'detail': {'size': (960, 720), 'budget': 120 * 1024},
+    'retina': {'size': (1920, 1440), 'budget': 350 * 1024},
+}
+
+RECIPE_IMAGE_MAX_QUALITY = 85
+
+RECIPE_IMAGE_MIN_QUALITY = 45
+
+RECIPE_IMAGE_QUALITY_STEP = 10
+
+# Threads per process encoding image variants after a write commits;
+# with 0 they are encoded inline, after the commit but in the request.
+RECIPE_IMAGE_WORKERS = int(os.getenv('RECIPE_IMAGE_WORKERS', 2))
+
+# Unreferenced media younger than this, in seconds, may belong to a
+# write still in flight and is kept by delete_unused_media.
+MEDIA_CLEANUP_MIN_AGE = 60 * 60
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -10,7 +10,20 @@ https://docs.djangoproject.com/en/4.1/howto/deployment/wsgi/
 import os
 
 from django.core.wsgi import get_wsgi_application
+from django.db import DatabaseError
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
 
 application = get_wsgi_application()
+
+from api.snapshots import ingredient_snapshot, tag_snapshot  # noqa: E402
+from recipes.cook_with_index import cook_with_index  # noqa: E402
+from recipes.ingredient_index import ingredient_index  # noqa: E402
+
+try:
+    ingredient_index.build()
+    cook_with_index.build()
+    ingredient_snapshot.build()
+    tag_snapshot.build()
+except DatabaseError:
+    pass
@@ -1,7 +1,39 @@
 from django.contrib import admin
 
+from users.admin_filters import input_filter
+from users.paginators import EstimatedCountPaginator
+
+from users.models import User
+
+from .counters import recount
 from .models import (Favorite, Ingredient, IngredientRecipe, Recipe,
                      ShoppingCart, Tag)
+from .services import rebuild_shopping_lists
+
+
+class RecountOnChangeMixin:
+    """
+    Admin mixin recounting the counters of reassigned rows.
+
+    Counter signals only see rows being created or deleted, so when
+    a change form moves a row to another recipe or user, the counters
+    of both the old and the new one are recounted.
+
+    Attributes:
+        recounted_fields (dict): The model holding the counters,
+        by the name of the foreign key pointing at it.
+
+    """
+    recounted_fields = {}
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if not change:
+            return
+        for field, model in self.recounted_fields.items():
+            if field in form.changed_data:
+                recount(model, [
+                    getattr(obj, f'{field}_id'), form.initial.get(field)])
 
 
 class IngredientInline(admin.TabularInline):
@@ -10,23 +42,36 @@ class IngredientInline(admin.TabularInline):
 
     """
     model = IngredientRecipe
+    autocomplete_fields = ('ingredient',)
     extra = 3
     min_num = 1
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(RecountOnChangeMixin, admin.ModelAdmin):
     """
     Admin configuration for the Recipe model.
 
+    The changelist joins authors and prefetches ingredients, so a
+    page costs a constant number of queries, and large tables are
+    counted from the planner estimate.
+
     """
     list_display = ('author', 'name', 'cooking_time',
                     'get_favorites', 'get_ingredients',)
-    search_fields = ('name', 'author', 'tags')
-    list_filter = ('author', 'name', 'tags')
+    list_select_related = ('author',)
+    search_fields = ('name', 'author__username', 'author__email')
+    list_filter = (input_filter('author__username', 'author'), 'tags')
+    autocomplete_fields = ('author',)
     inlines = (IngredientInline,)
+    recounted_fields = {'author': User}
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-empty-'
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('ingredients')
+
     def get_favorites(self, obj):
         """
         Get the number of favorites for a recipe.
@@ -38,9 +83,10 @@ class RecipeAdmin(admin.ModelAdmin):
             int: The number of favorites.
 
         """
-        return obj.favorites.count()
+        return obj.favorites_count
 
     get_favorites.short_description = 'Favorites'
+    get_favorites.admin_order_field = 'favorites_count'
 
     def get_ingredients(self, obj):
         """
@@ -59,6 +105,15 @@ class RecipeAdmin(admin.ModelAdmin):
 
     get_ingredients.short_description = 'Ingredients'
 
+    def save_related(self, request, form, formsets, change):
+        """
+        Rebuild the shopping lists holding the recipe after an edit.
+
+        """
+        super().save_related(request, form, formsets, change)
+        rebuild_shopping_lists(form.instance.shopping_list.values_list(
+            'user_id', flat=True))
+
 
 class IngredientAdmin(admin.ModelAdmin):
     """
@@ -67,7 +122,7 @@ class IngredientAdmin(admin.ModelAdmin):
     """
     list_display = ('name', 'measurement_unit')
     search_fields = ('name',)
-    list_filter = ('name',)
+    list_filter = ('measurement_unit',)
     empty_value_display = '-empty-'
 
 
@@ -82,27 +137,56 @@ class TagAdmin(admin.ModelAdmin):
     empty_value_display = '-empty-'
 
 
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(RecountOnChangeMixin, admin.ModelAdmin):
     """
     Admin configuration for the Favorite model.
 
     """
     list_display = ('user', 'recipe')
-    list_filter = ('user', 'recipe')
-    search_fields = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    list_filter = (
+        input_filter('user__username', 'user'),
+        input_filter('recipe__name__istartswith', 'recipe', 'recipe'),
+    )
+    search_fields = ('user__username', 'recipe__name')
+    autocomplete_fields = ('user', 'recipe')
+    recounted_fields = {'recipe': Recipe}
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-empty-'
 
 
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(RecountOnChangeMixin, admin.ModelAdmin):
     """
     Admin configuration for the ShoppingCart model.
 
     """
     list_display = ('recipe', 'user')
-    list_filter = ('recipe', 'user')
-    search_fields = ('user',)
+    list_select_related = ('user', 'recipe')
+    list_filter = (
+        input_filter('recipe__name__istartswith', 'recipe', 'recipe'),
+        input_filter('user__username', 'user'),
+    )
+    search_fields = ('user__username', 'recipe__name')
+    autocomplete_fields = ('user', 'recipe')
+    recounted_fields = {'recipe': Recipe}
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-empty-'
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        rebuild_shopping_lists({obj.user_id, form.initial.get('user')})
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        rebuild_shopping_lists([obj.user_id])
+
+    def delete_queryset(self, request, queryset):
+        user_ids = set(queryset.values_list('user_id', flat=True))
+        super().delete_queryset(request, queryset)
+        rebuild_shopping_lists(user_ids)
+
 
 admin.site.register(ShoppingCart, ShoppingCartAdmin)
 admin.site.register(Ingredient, IngredientAdmin)
@@ -0,0 +1,190 @@
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+
+from .models import IngredientRecipe
+
+EMPTY = np.zeros(0, dtype=np.int64)
+
+
+def split_groups(keys, values):
+    """
+    Group values by key, both already sorted by key.
+
+    Returns:
+        dict: Arrays of values keyed by key.
+
+    """
+    if not len(keys):
+        return {}
+    boundaries = np.flatnonzero(np.diff(keys)) + 1
+    starts = np.concatenate(([0], boundaries))
+    return {
+        int(keys[start]): group
+        for start, group in zip(starts, np.split(values, boundaries))
+    }
+
+
+class CookWithIndex:
+    """
+    Process-local inverted index from ingredients to recipes.
+
+    Every ingredient maps to a sorted NumPy array of the ids of the
+    recipes using it, and a dense array indexed by recipe id holds
+    the number of ingredients of every recipe, so the coverage of any
+    set of ingredients is computed with vectorized concatenation,
+    counting and membership tests instead of joins over
+    IngredientRecipe. Recipe writes update the arrays incrementally,
+    and the index is rebuilt after COOK_WITH_INDEX_TTL seconds to
+    pick up writes made by other processes.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built_at = None
+        self._postings = {}
+        self._recipes = {}
+        self._sizes = EMPTY
+
+    def invalidate(self):
+        """
+        Drop the index so the next search rebuilds it.
+
+        """
+        self._built_at = None
+
+    def build(self):
+        """
+        Load IngredientRecipe and build the posting arrays.
+
+        Rows are deduplicated and sorted by ingredient and recipe
+        with a single np.unique over the (ingredient, recipe) pairs.
+
+        """
+        rows = np.unique(np.array(
+            IngredientRecipe.objects.order_by().values_list(
+                'ingredient_id', 'recipe_id'),
+            dtype=np.int64
+        ).reshape(-1, 2), axis=0)
+        ingredient_ids, recipe_ids = rows[:, 0], rows[:, 1]
+        by_recipe = np.lexsort((ingredient_ids, recipe_ids))
+        postings = split_groups(ingredient_ids, recipe_ids)
+        recipes = split_groups(
+            recipe_ids[by_recipe], ingredient_ids[by_recipe])
+        sizes = np.bincount(recipe_ids, minlength=1)
+        with self._lock:
+            self._postings = postings
+            self._recipes = recipes
+            self._sizes = sizes
+            self._built_at = time.monotonic()
+
+    def _ensure_built(self):
+        built_at = self._built_at
+        if (built_at is None or time.monotonic() - built_at
+                > settings.COOK_WITH_INDEX_TTL):
+            self.build()
+
+    def update(self, recipe_ids):
+        """
+        Apply the current ingredients of written or deleted recipes.
+
+        Only the postings of ingredients added to or removed from a
+        recipe are rewritten. An index that was never built is left
+        to be built lazily.
+
+        Parameters:
+            recipe_ids (iterable): The ids of the changed recipes.
+
+        """
+        if self._built_at is None:
+            return
+        recipe_ids = set(recipe_ids)
+        current = defaultdict(set)
+        for recipe_id, ingredient_id in IngredientRecipe.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'ingredient_id'):
+            current[recipe_id].add(ingredient_id)
+        with self._lock:
+            if recipe_ids and max(recipe_ids) >= len(self._sizes):
+                self._sizes = np.concatenate((self._sizes, np.zeros(
+                    max(recipe_ids) + 1 - len(self._sizes), dtype=np.int64)))
+            for recipe_id in recipe_ids:
+                old = set(self._recipes.pop(recipe_id, EMPTY).tolist())
+                new = current[recipe_id]
+                for ingredient_id in old - new:
+                    posting = self._postings[ingredient_id]
+                    posting = posting[posting != recipe_id]
+                    if len(posting):
+                        self._postings[ingredient_id] = posting
+                    else:
+                        del self._postings[ingredient_id]
+                for ingredient_id in new - old:
+                    posting = self._postings.get(ingredient_id, EMPTY)
+                    self._postings[ingredient_id] = np.insert(
+                        posting, np.searchsorted(posting, recipe_id),
+                        recipe_id
+                    )
+                if new:
+                    self._recipes[recipe_id] = np.array(
+                        sorted(new), dtype=np.int64)
+                self._sizes[recipe_id] = len(new)
+
+    def search(self, ingredient_ids, include=(), exclude=(), limit=None):
+        """
+        Rank recipes by the share of their ingredients the user has.
+
+        Parameters:
+            ingredient_ids (iterable): The ingredients the user has.
+            include (iterable): Ingredients every result must use;
+            they count as available.
+            exclude (iterable): Ingredients no result may use.
+            limit (int): The maximum number of results.
+
+        Returns:
+            list: (recipe id, available ingredients, all ingredients)
+            tuples, best coverage first, then fewest missing
+            ingredients, then newest.
+
+        """
+        limit = limit or settings.COOK_WITH_MAX_RESULTS
+        self._ensure_built()
+        available = set(ingredient_ids) | set(include)
+        with self._lock:
+            postings = [
+                self._postings[ingredient_id]
+                for ingredient_id in available
+                if ingredient_id in self._postings
+            ]
+            if not postings:
+                return []
+            recipe_ids, matched = np.unique(
+                np.concatenate(postings), return_counts=True)
+            keep = np.ones(len(recipe_ids), dtype=bool)
+            for ingredient_id in include:
+                keep &= np.isin(
+                    recipe_ids, self._postings.get(ingredient_id, EMPTY),
+                    assume_unique=True
+                )
+            excluded = [
+                self._postings[ingredient_id] for ingredient_id in exclude
+                if ingredient_id in self._postings
+            ]
+            if excluded:
+                keep &= ~np.isin(recipe_ids, np.concatenate(excluded))
+            recipe_ids, matched = recipe_ids[keep], matched[keep]
+            sizes = self._sizes[recipe_ids]
+        coverage = matched / sizes
+        order = np.lexsort((-recipe_ids, sizes - matched, -coverage))
+        order = order[:limit]
+        return list(zip(
+            recipe_ids[order].tolist(),
+            matched[order].tolist(),
+            sizes[order].tolist(),
+        ))
+
+
+cook_with_index = CookWithIndex()
@@ -0,0 +1,114 @@
+import threading
+from contextlib import contextmanager
+
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from users.models import Follow, User
+
+from .models import Favorite, Recipe, ShoppingCart
+
+# Counted model: {counter column: (counted model, its foreign key)}.
+COUNTERS = {
+    Recipe: {
+        'favorites_count': (Favorite, 'recipe'),
+        'in_carts_count': (ShoppingCart, 'recipe'),
+    },
+    User: {
+        'recipes_count': (Recipe, 'author'),
+        'followers_count': (Follow, 'author'),
+        'following_count': (Follow, 'user'),
+    },
+}
+
+_state = threading.local()
+
+
+@contextmanager
+def counters_applied_in_bulk():
+    """
+    Suspend the per-row counter signals inside the block.
+
+    Bulk writes use it around deletes that would otherwise update
+    the counters once per deleted row, and shift them in one
+    statement themselves.
+
+    """
+    _state.depth = getattr(_state, 'depth', 0) + 1
+    try:
+        yield
+    finally:
+        _state.depth -= 1
+
+
+def counters_suspended():
+    return getattr(_state, 'depth', 0) > 0
+
+
+def shift_counters(queryset, **deltas):
+    """
+    Add deltas to counter columns of every row in one UPDATE.
+
+    Counters never go below zero, so drift cannot break the
+    non-negative column constraints.
+
+    Parameters:
+        queryset (QuerySet): The rows to update.
+        deltas (int): Amounts to add, keyed by counter column.
+
+    """
+    queryset.update(**{
+        field: Greatest(F(field) + delta, Value(0))
+        for field, delta in deltas.items()
+    })
+
+
+def count_subquery(model, field):
+    """
+    Count the rows of a model pointing at the outer row.
+
+    """
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def find_drift(model):
+    """
+    Get the rows whose counters differ from the actual counts.
+
+    Returns:
+        QuerySet: The drifted rows.
+
+    """
+    counters = COUNTERS[model]
+    drift = Q()
+    for counter in counters:
+        drift |= ~Q(**{counter: F(f'actual_{counter}')})
+    return model.objects.annotate(**{
+        f'actual_{counter}': count_subquery(*counted)
+        for counter, counted in counters.items()
+    }).filter(drift)
+
+
+def recount(model, ids=None):
+    """
+    Recompute the counters of a model from the counted tables.
+
+    Parameters:
+        model (Model): Recipe or User.
+        ids (iterable): Limit the recount to these rows.
+
+    Returns:
+        int: The number of rows updated.
+
+    """
+    queryset = model.objects.all()
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    return queryset.update(**{
+        counter: count_subquery(*counted)
+        for counter, counted in COUNTERS[model].items()
+    })
@@ -0,0 +1,274 @@
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import Recipe
+
+IMAGE_FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+
+# Raised by Pillow and the storage for missing, truncated or hostile
+# image files.
+IMAGE_ERRORS = (OSError, SyntaxError, ValueError, Image.DecompressionBombError)
+
+MEDIA_DIRECTORIES = ('recipes/image', 'recipes/variants')
+
+logger = logging.getLogger(__name__)
+
+variant_executor = ThreadPoolExecutor(
+    max_workers=max(settings.RECIPE_IMAGE_WORKERS, 1),
+    thread_name_prefix='image-variants'
+)
+
+
+def prepare_image(file):
+    """
+    Open an uploaded image as upright RGB pixels without metadata.
+
+    Parameters:
+        file (File): The original image file.
+
+    Returns:
+        Image: The decoded image, rotated by its EXIF orientation.
+
+    """
+    file.seek(0)
+    with Image.open(file) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            return background
+        return image.convert('RGB')
+
+
+def encode(image, image_format, budget):
+    """
+    Encode the image at the best quality fitting the byte budget.
+
+    The quality is lowered step by step down to
+    RECIPE_IMAGE_MIN_QUALITY; the smallest encoding is kept if
+    even that does not fit.
+
+    Returns:
+        bytes: The encoded image.
+
+    """
+    quality = settings.RECIPE_IMAGE_MAX_QUALITY
+    while True:
+        buffer = io.BytesIO()
+        image.save(buffer, image_format, quality=quality, optimize=True)
+        content = buffer.getvalue()
+        if (len(content) <= budget
+                or quality <= settings.RECIPE_IMAGE_MIN_QUALITY):
+            return content
+        quality -= settings.RECIPE_IMAGE_QUALITY_STEP
+
+
+def delete_variants(storage, variants):
+    """
+    Delete the files of previously generated variants.
+
+    Files in a content-addressed storage may be shared with other
+    recipes and are left for delete_unused_media.
+
+    """
+    if getattr(storage, 'content_addressed', False):
+        return
+    for name in settings.RECIPE_IMAGE_VARIANTS:
+        for extension in IMAGE_FORMATS:
+            path = variants.get(name, {}).get(extension)
+            if path:
+                storage.delete(path)
+
+
+def build_variants(recipe):
+    """
+    Generate the sized, recompressed variants of a recipe image.
+
+    Every variant in RECIPE_IMAGE_VARIANTS is fitted into its box,
+    never upscaled, and saved as WebP and JPEG under its byte budget.
+
+    Parameters:
+        recipe (Recipe): The recipe with a saved image.
+
+    Returns:
+        dict: The source image name and, per variant, its size and
+        the storage paths of every format.
+
+    """
+    storage = recipe.image.storage
+    delete_variants(storage, recipe.image_variants or {})
+    source = prepare_image(recipe.image)
+    variants = {'source': recipe.image.name}
+    for name, options in settings.RECIPE_IMAGE_VARIANTS.items():
+        image = source.copy()
+        image.thumbnail(options['size'], Image.LANCZOS)
+        variant = {'width': image.width, 'height': image.height}
+        for extension, image_format in IMAGE_FORMATS.items():
+            content = encode(image, image_format, options['budget'])
+            variant[extension] = storage.save(
+                f'recipes/variants/{name}.{extension}',
+                ContentFile(content)
+            )
+        variants[name] = variant
+    return variants
+
+
+def refresh_variants(recipe):
+    """
+    Rebuild the variants of a recipe whose image has changed.
+
+    An image that cannot be read is logged and its variants are left
+    empty, for build_image_variants to backfill once it is fixed.
+
+    Returns:
+        bool: Whether the variants were rebuilt.
+
+    """
+    variants = recipe.image_variants or {}
+    if not recipe.image or variants.get('source') == recipe.image.name:
+        return False
+    try:
+        recipe.image_variants = build_variants(recipe)
+    except IMAGE_ERRORS as error:
+        logger.warning('Cannot build the image variants of recipe %s: %s',
+                       recipe.pk, error)
+        return False
+    # The image may have been replaced while this one was encoded.
+    return bool(type(recipe).objects.filter(
+        pk=recipe.pk, image=recipe.image.name
+    ).update(image_variants=recipe.image_variants))
+
+
+def refresh_recipe_variants(recipe_id):
+    """
+    Load a recipe and rebuild its variants if its image has changed.
+
+    """
+    recipe = Recipe.objects.only('id', 'image', 'image_variants').filter(
+        pk=recipe_id).first()
+    if recipe is not None:
+        refresh_variants(recipe)
+
+
+def run_variant_job(recipe_id):
+    try:
+        refresh_recipe_variants(recipe_id)
+    except Exception:
+        logger.exception('Cannot build the image variants of recipe %s',
+                         recipe_id)
+    finally:
+        connections.close_all()
+
+
+def schedule_variants(recipe_id):
+    """
+    Build the variants of a recipe in a background thread.
+
+    The request returns without waiting for the encoding. Jobs lost
+    when a process stops are backfilled by build_image_variants,
+    which should run periodically.
+
+    Parameters:
+        recipe_id (int): The id of the recipe with a new image.
+
+    """
+    if settings.RECIPE_IMAGE_WORKERS:
+        variant_executor.submit(run_variant_job, recipe_id)
+    else:
+        refresh_recipe_variants(recipe_id)
+
+
+def list_files(storage, directory):
+    """
+    List the files under a storage directory recursively.
+
+    Yields:
+        str: The storage names of the files.
+
+    """
+    if not storage.exists(directory):
+        return
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield f'{directory}/{name}'
+    for name in directories:
+        yield from list_files(storage, f'{directory}/{name}')
+
+
+def find_unused_media(storage, min_age):
+    """
+    Find recipe images and variants no recipe references any more.
+
+    Content-addressed files are shared and never deleted per recipe,
+    so replaced images and variant sets are only found here.
+
+    Parameters:
+        storage (Storage): The storage of recipe images.
+        min_age (int): Files modified within this many seconds are
+        skipped, they may belong to a write still in flight.
+
+    Yields:
+        str: The storage names of the unused files.
+
+    """
+    referenced = set()
+    recipes = Recipe.objects.values_list('image', 'image_variants')
+    for image, variants in recipes.iterator():
+        referenced.add(image)
+        for name in settings.RECIPE_IMAGE_VARIANTS:
+            referenced.update(
+                path for extension, path in (variants or {}).get(
+                    name, {}).items()
+                if extension in IMAGE_FORMATS
+            )
+    cutoff = timezone.now() - timedelta(seconds=min_age)
+    for directory in MEDIA_DIRECTORIES:
+        for name in list_files(storage, directory):
+            if (name not in referenced
+                    and storage.get_modified_time(name) < cutoff):
+                yield name
+
+
+def get_variant_urls(recipe, request=None):
+    """
+    Get the URLs of the image variants of a recipe.
+
+    Variants of a replaced image are left out until the new ones
+    are built; clients fall back to the original image meanwhile.
+
+    Parameters:
+        recipe (Recipe): The recipe.
+        request (Request): Used to build absolute URLs.
+
+    Returns:
+        dict: Per variant, its width, height and a URL per format.
+
+    """
+    storage = recipe.image.storage
+    variants = recipe.image_variants or {}
+    if variants.get('source') != recipe.image.name:
+        return {}
+    urls = {}
+    for name in settings.RECIPE_IMAGE_VARIANTS:
+        variant = variants.get(name)
+        if not variant:
+            continue
+        urls[name] = {'width': variant['width'], 'height': variant['height']}
+        for extension in IMAGE_FORMATS:
+            url = storage.url(variant[extension])
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[name][extension] = url
+    return urls
@@ -0,0 +1,155 @@
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+from transliterate import translit
+from unidecode import unidecode
+
+from .models import Ingredient
+
+LATIN_LETTERS = re.compile('[a-z]')
+
+
+class IngredientIndex:
+    """
+    Process-local prefix index over the ingredient catalog.
+
+    Ingredient names are kept lowercased in sorted arrays, both as
+    written and transliterated to Latin, so prefix lookups are a
+    bisect away. The index is built lazily from the Ingredient table,
+    dropped by signals whenever an ingredient changes and rebuilt
+    after INGREDIENT_INDEX_TTL seconds to pick up changes made by
+    other processes.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built_at = None
+        self._ingredients = []
+        self._keys = {}
+        self._blobs = {}
+
+    def invalidate(self):
+        """
+        Drop the index so the next search rebuilds it.
+
+        """
+        self._built_at = None
+
+    def build(self):
+        """
+        Load the ingredient catalog and build the sorted key arrays.
+
+        """
+        ingredients = list(Ingredient.objects.order_by(
+            'name', 'measurement_unit'
+        ).values('id', 'name', 'measurement_unit'))
+        names = [ingredient['name'].lower() for ingredient in ingredients]
+        keys = {
+            'native': sorted(
+                (name, position) for position, name in enumerate(names)),
+            'latin': sorted(
+                (unidecode(name), position)
+                for position, name in enumerate(names)
+            ),
+        }
+        blobs = {
+            key_name: self._build_blob(key_array)
+            for key_name, key_array in keys.items()
+        }
+        with self._lock:
+            self._ingredients = ingredients
+            self._keys = keys
+            self._blobs = blobs
+            self._built_at = time.monotonic()
+
+    @staticmethod
+    def _build_blob(key_array):
+        """
+        Join the keys into one string for substring scans.
+
+        Returns:
+            tuple: The joined keys and the offset each key starts at.
+
+        """
+        offsets = []
+        offset = 0
+        for key, _ in key_array:
+            offsets.append(offset)
+            offset += len(key) + 1
+        return '\n'.join(key for key, _ in key_array), offsets
+
+    def _ensure_built(self):
+        built_at = self._built_at
+        if (built_at is None or time.monotonic() - built_at
+                > settings.INGREDIENT_INDEX_TTL):
+            self.build()
+
+    @staticmethod
+    def _query_variants(query):
+        """
+        Get the (key array, query) pairs a query is looked up with.
+
+        Latin queries are also transliterated to Cyrillic and matched
+        against the Latin spelling of every name.
+
+        """
+        variants = [('native', query)]
+        if LATIN_LETTERS.search(query):
+            variants.append(('native', translit(query, 'ru').lower()))
+            variants.append(('latin', query))
+        return variants
+
+    def search(self, query, limit=None):
+        """
+        Find ingredients by name, prefix matches first.
+
+        Parameters:
+            query (str): The text typed by the user.
+            limit (int): The maximum number of results.
+
+        Returns:
+            list: Ingredient dicts with id, name and measurement_unit.
+
+        """
+        limit = limit or settings.INGREDIENT_SEARCH_LIMIT
+        query = query.strip().lower()
+        if not query:
+            return []
+        self._ensure_built()
+        with self._lock:
+            ingredients = self._ingredients
+            keys = self._keys
+            blobs = self._blobs
+        variants = self._query_variants(query)
+
+        prefix_matches = set()
+        for key_name, value in variants:
+            key_array = keys[key_name]
+            index = bisect_left(key_array, (value,))
+            while (index < len(key_array)
+                   and key_array[index][0].startswith(value)):
+                prefix_matches.add(key_array[index][1])
+                index += 1
+        results = sorted(prefix_matches)[:limit]
+
+        if len(results) < limit:
+            contains_matches = set()
+            for key_name, value in variants:
+                blob, offsets = blobs[key_name]
+                found = blob.find(value)
+                while found != -1:
+                    index = bisect_right(offsets, found) - 1
+                    contains_matches.add(keys[key_name][index][1])
+                    found = blob.find(value, offsets[index + 1]
+                                      if index + 1 < len(offsets)
+                                      else len(blob))
+            contains_matches -= prefix_matches
+            results.extend(sorted(contains_matches)[:limit - len(results)])
+        return [ingredients[position] for position in results]
+
+
+ingredient_index = IngredientIndex()
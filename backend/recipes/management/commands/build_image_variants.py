@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import IMAGE_ERRORS, build_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Generate the sized image variants of recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Rebuild variants that already exist'
+        )
+
+    def handle(self, *args, **options):
+        built = failed = 0
+        for recipe in Recipe.objects.only('id', 'image', 'image_variants'):
+            source = (recipe.image_variants or {}).get('source')
+            if not options['all'] and source == recipe.image.name:
+                continue
+            try:
+                recipe.image_variants = build_variants(recipe)
+            except IMAGE_ERRORS as error:
+                failed += 1
+                self.stderr.write(f'Recipe {recipe.pk}: {error}')
+                continue
+            Recipe.objects.filter(pk=recipe.pk).update(
+                image_variants=recipe.image_variants)
+            built += 1
+        self.stdout.write(
+            f'Built image variants for {built} recipes, {failed} failed')
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from recipes.similarity import update_similar_recipes
+
+
+class Command(BaseCommand):
+    help = 'Compute the similar recipes shown on recipe pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes', type=int, nargs='+',
+            help='Only update these recipes and their neighbours'
+        )
+        parser.add_argument(
+            '--missing', action='store_true',
+            help='Only update recipes without similar recipes yet'
+        )
+        parser.add_argument(
+            '--count', type=int,
+            help='Number of similar recipes kept per recipe'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        recipe_ids = options['recipes']
+        if options['missing']:
+            recipe_ids = list(recipe_ids or ()) + list(
+                Recipe.objects.filter(similar_recipes__isnull=True)
+                .values_list('id', flat=True))
+        updated = update_similar_recipes(recipe_ids, options['count'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated similar recipes of {updated} recipes '
+            f'in {time.monotonic() - started:.2f}s'
+        ))
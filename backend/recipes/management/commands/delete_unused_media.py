@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.images import find_unused_media
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Delete recipe images and variants no recipe references'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only list the unused files'
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=settings.MEDIA_CLEANUP_MIN_AGE,
+            help='Keep files modified within this many seconds'
+        )
+
+    def handle(self, *args, **options):
+        storage = Recipe._meta.get_field('image').storage
+        unused = list(find_unused_media(storage, options['min_age']))
+        for name in unused:
+            if options['dry_run']:
+                self.stdout.write(name)
+            else:
+                storage.delete(name)
+        self.stdout.write(
+            f'{len(unused)} unused files'
+            + (' found' if options['dry_run'] else ' deleted')
+        )
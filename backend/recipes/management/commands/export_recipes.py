@@ -0,0 +1,39 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand
+
+from recipes.transfer import export_recipe, iter_recipe_batches
+
+
+class Command(BaseCommand):
+    help = 'Export recipes with their authors, tags and ingredients as JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', help='File to write to, stdout by default')
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of recipes loaded per query'
+        )
+        parser.add_argument(
+            '--embed-images', action='store_true',
+            help='Include the image bytes instead of only media paths'
+        )
+
+    def handle(self, *args, **options):
+        output = (open(options['output'], 'w', encoding='utf-8')
+                  if options['output'] else sys.stdout)
+        exported = 0
+        try:
+            for batch in iter_recipe_batches(options['batch_size']):
+                for recipe in batch:
+                    output.write(json.dumps(
+                        export_recipe(recipe, options['embed_images']),
+                        ensure_ascii=False
+                    ) + '\n')
+                exported += len(batch)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        self.stderr.write(f'Exported {exported} recipes')
@@ -0,0 +1,65 @@
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.ingredient_index import ingredient_index
+from recipes.transfer import import_recipes, read_batches
+
+
+class Command(BaseCommand):
+    help = 'Import recipes exported by export_recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='JSONL file to import')
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of recipes written per transaction'
+        )
+        parser.add_argument(
+            '--progress-file',
+            help='File recording imported lines, PATH.progress by default'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Ignore the recorded progress and import from the start'
+        )
+
+    def handle(self, *args, **options):
+        progress_file = (options['progress_file']
+                         or f'{options["path"]}.progress')
+        done = 0
+        if os.path.exists(progress_file) and not options['restart']:
+            with open(progress_file) as file:
+                done = int(file.read() or 0)
+            self.stdout.write(f'Resuming after line {done}')
+        started = time.monotonic()
+        imported = 0
+        try:
+            with open(options['path'], encoding='utf-8') as file:
+                lines = (
+                    (number, line) for number, line in enumerate(file, 1)
+                    if number > done and line.strip()
+                )
+                for batch in read_batches(lines, options['batch_size']):
+                    import_recipes([json.loads(line) for _, line in batch])
+                    imported += len(batch)
+                    done = batch[-1][0]
+                    with open(progress_file, 'w') as progress:
+                        progress.write(str(done))
+                    self.stdout.write(
+                        f'Imported {imported} recipes, line {done}')
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(
+                f'Import stopped after line {done}: {error}')
+        finally:
+            if imported:
+                ingredient_index.invalidate()
+        elapsed = time.monotonic() - started
+        rate = imported / elapsed * 60 if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} recipes in {elapsed:.1f}s '
+            f'({rate:.0f} recipes/min). '
+            'Run build_image_variants to generate their image variants.'
+        ))
@@ -1,17 +1,138 @@
 import csv
-from django.core.management.base import BaseCommand
-from recipes.models import Ingredient
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.ingredient_index import ingredient_index
+from recipes.models import CatalogVersion, Ingredient, IngredientRecipe
+from recipes.search import get_search_backend
+
+CSV_HEADER = ('name', 'measurement_unit')
+
+
+def normalize(value):
+    """
+    Collapse whitespace and case so spelling variants compare equal.
+
+    """
+    return ' '.join(value.split()).casefold()
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if not row or tuple(row[:2]) == CSV_HEADER:
+            continue
+        yield row[0], row[1]
+
+
+def read_json(file):
+    for row in json.load(file):
+        yield row['name'], row['measurement_unit']
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
 
 
 class Command(BaseCommand):
-    help = 'Import data from ingredients.csv'
+    help = 'Load the ingredient catalog from a CSV or JSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=settings.BASE_DIR / 'data' / 'ingredients.csv',
+            help='CSV (name,measurement_unit rows) or JSON file'
+        )
+        parser.add_argument(
+            '--format', choices=READERS,
+            help='Input format, guessed from the file extension by default'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of rows written per statement'
+        )
+        parser.add_argument(
+            '--on-conflict', choices=('ignore', 'update'), default='ignore',
+            help='Keep or rewrite existing ingredients spelled differently'
+        )
+
+    def read(self, path, file_format):
+        """
+        Read the unique, whitespace-trimmed rows of the input file.
+
+        Returns:
+            dict: (name, measurement_unit) by normalized key.
+
+        """
+        file_format = file_format or str(path).rsplit('.', 1)[-1].lower()
+        if file_format not in READERS:
+            raise CommandError(f'Unknown input format: {file_format}')
+        rows = {}
+        try:
+            with open(path, encoding='utf-8') as file:
+                for name, measurement_unit in READERS[file_format](file):
+                    name = ' '.join(name.split())
+                    measurement_unit = ' '.join(measurement_unit.split())
+                    if name and measurement_unit:
+                        rows.setdefault(
+                            (normalize(name), normalize(measurement_unit)),
+                            (name, measurement_unit)
+                        )
+        except (OSError, ValueError, KeyError, IndexError) as error:
+            raise CommandError(f'Cannot read {path}: {error}')
+        return rows
 
     def handle(self, *args, **options):
-        with open('data/ingredients.csv', encoding='utf-8') as file:
-            reader = csv.reader(file)
-            next(reader)
-            ingredients = [
-                Ingredient(name=name, measurement_unit=unit) for name,
-                unit in reader
-            ]
-            Ingredient.objects.bulk_create(ingredients)
+        started = time.monotonic()
+        rows = self.read(options['path'], options['format'])
+        existing = {
+            (normalize(name), normalize(measurement_unit)):
+                (pk, name, measurement_unit)
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit')
+        }
+        created = [
+            Ingredient(name=name, measurement_unit=measurement_unit)
+            for key, (name, measurement_unit) in rows.items()
+            if key not in existing
+        ]
+        changed = [
+            Ingredient(id=existing[key][0], name=name,
+                       measurement_unit=measurement_unit)
+            for key, (name, measurement_unit) in rows.items()
+            if key in existing and existing[key][1:] != (
+                name, measurement_unit)
+        ]
+        updated = changed if options['on_conflict'] == 'update' else []
+
+        with transaction.atomic():
+            Ingredient.objects.bulk_create(
+                created, batch_size=options['batch_size'],
+                ignore_conflicts=True
+            )
+            Ingredient.objects.bulk_update(
+                updated, ('name', 'measurement_unit'),
+                batch_size=options['batch_size']
+            )
+            if created or updated:
+                CatalogVersion.bump_on_commit(
+                    CatalogVersion.INGREDIENTS, CatalogVersion.RECIPES)
+        if created or updated:
+            ingredient_index.invalidate()
+        if updated:
+            recipe_ids = list(IngredientRecipe.objects.filter(
+                ingredient__in=updated).values_list('recipe_id', flat=True))
+            get_search_backend().index(recipe_ids)
+
+        elapsed = time.monotonic() - started
+        rate = len(rows) / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(rows)} rows read: {len(created)} created, '
+            f'{len(updated)} updated, '
+            f'{len(rows) - len(created) - len(updated)} unchanged '
+            f'in {elapsed:.2f}s ({rate:.0f} rows/s)'
+        ))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import Recipe
+from recipes.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of recipes indexed per statement'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        backend = get_search_backend()
+        recipe_ids = list(Recipe.objects.order_by(
+            'id').values_list('id', flat=True))
+        batch_size = options['batch_size']
+        for start in range(0, len(recipe_ids), batch_size):
+            with transaction.atomic():
+                backend.index(recipe_ids[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {len(recipe_ids)} recipes with '
+            f'{type(backend).__name__} '
+            f'in {time.monotonic() - started:.2f}s'
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.services import find_shopping_list_drift, rebuild_shopping_lists
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored shopping lists from the carts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report the users whose shopping lists drifted'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drifted = find_shopping_list_drift()
+            if drifted and not options['dry_run']:
+                rebuild_shopping_lists(drifted)
+        self.stdout.write(
+            f'Shopping lists: {len(drifted)} drifted'
+            + ('' if options['dry_run'] else ', rebuilt')
+        )
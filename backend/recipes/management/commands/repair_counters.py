@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import COUNTERS, find_drift, recount
+
+
+class Command(BaseCommand):
+    help = 'Recount the denormalized recipe and user counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report the rows whose counters drifted'
+        )
+
+    def handle(self, *args, **options):
+        for model in COUNTERS:
+            with transaction.atomic():
+                drifted = list(find_drift(model).values_list('pk', flat=True))
+                if drifted and not options['dry_run']:
+                    recount(model, drifted)
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: {len(drifted)} drifted'
+                + ('' if options['dry_run'] else ', repaired')
+            )
@@ -0,0 +1,34 @@
+# Generated by Django 3.2.16 on 2026-10-17 06:58
+
+from django.db import migrations, models
+
+CATALOG_NAMES = ('recipes', 'tags', 'ingredients', 'activity')
+
+
+def create_versions(apps, schema_editor):
+    CatalogVersion = apps.get_model('recipes', 'CatalogVersion')
+    for name in CATALOG_NAMES:
+        CatalogVersion.objects.get_or_create(name=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_shoppinglistitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('name', models.CharField(max_length=150, primary_key=True, serialize=False, verbose_name='Name')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='Version')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Updated')),
+            ],
+            options={
+                'verbose_name': 'Catalog Version',
+                'verbose_name_plural': 'Catalog Versions',
+            },
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 3.2.16 on 2026-10-17 07:15
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = {
+    ('recipes', 'Recipe'): {
+        'favorites_count': (('recipes', 'Favorite'), 'recipe'),
+        'in_carts_count': (('recipes', 'ShoppingCart'), 'recipe'),
+    },
+    ('users', 'User'): {
+        'recipes_count': (('recipes', 'Recipe'), 'author'),
+        'followers_count': (('users', 'Follow'), 'author'),
+        'following_count': (('users', 'Follow'), 'user'),
+    },
+}
+
+
+def fill_counters(apps, schema_editor):
+    for model, counters in COUNTERS.items():
+        updates = {}
+        for counter, (counted, field) in counters.items():
+            updates[counter] = Coalesce(Subquery(
+                apps.get_model(*counted).objects.filter(
+                    **{field: OuterRef('pk')}
+                ).order_by().values(field).annotate(
+                    total=Count('pk')).values('total')
+            ), 0)
+        apps.get_model(*model).objects.update(**updates)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_image_variants'),
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Favorites Count'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='In Carts Count'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.db import migrations
+
+DOCUMENT_SOURCE = (
+    'FROM recipes_recipe recipe '
+    'LEFT JOIN recipes_ingredientrecipe amount '
+    'ON amount.recipe_id = recipe.id '
+    'LEFT JOIN recipes_ingredient ingredient '
+    'ON ingredient.id = amount.ingredient_id '
+    'GROUP BY recipe.id'
+)
+
+CREATE_SQL = {
+    'postgresql': (
+        'CREATE TABLE recipes_search ('
+        'recipe_id bigint PRIMARY KEY '
+        'REFERENCES recipes_recipe (id) ON DELETE CASCADE '
+        'DEFERRABLE INITIALLY DEFERRED, '
+        'document tsvector NOT NULL)',
+        'CREATE INDEX recipes_search_document '
+        'ON recipes_search USING GIN (document)',
+        'INSERT INTO recipes_search (recipe_id, document) '
+        'SELECT recipe.id, '
+        "setweight(to_tsvector(%(config)s, recipe.name), 'A') || "
+        "setweight(to_tsvector(%(config)s, coalesce("
+        "string_agg(ingredient.name, ' '), '')), 'B') || "
+        "setweight(to_tsvector(%(config)s, recipe.text), 'C') "
+        + DOCUMENT_SOURCE,
+    ),
+    'sqlite': (
+        'CREATE VIRTUAL TABLE recipes_search USING fts5('
+        "name, ingredients, text, tokenize = 'unicode61 remove_diacritics 2')",
+        'INSERT INTO recipes_search (rowid, name, ingredients, text) '
+        'SELECT recipe.id, recipe.name, '
+        "coalesce(group_concat(ingredient.name, ' '), ''), recipe.text "
+        + DOCUMENT_SOURCE,
+    ),
+}
+
+
+def create_search_table(apps, schema_editor):
+    # Documents are built with the configuration the search backend
+    # queries with.
+    params = {'config': settings.RECIPE_SEARCH_CONFIG}
+    for sql in CREATE_SQL.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(sql, params if '%(config)s' in sql else ())
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor in CREATE_SQL:
+        schema_editor.execute('DROP TABLE recipes_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -3,11 +3,15 @@ from colorfield.fields import ColorField
 from django.conf import settings
 from django.core.validators import (MaxValueValidator, MinValueValidator,
                                     RegexValidator)
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Exists, F, OuterRef, Prefetch, Window
 from django.db.models.constraints import UniqueConstraint
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+from django.utils import timezone
 from django.utils.text import slugify
 
-from users.models import User
+from users.models import CounterFieldsMixin, User
 
 
 class Ingredient(models.Model):
@@ -95,7 +99,90 @@ class Tag(models.Model):
         return f'-{suffix}' if suffix > 1 else ''
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+    """
+    QuerySet with helpers for rendering recipes to a given user.
+    """
+
+    def annotate_user_flags(self, user):
+        """
+        Annotate is_favorited and is_in_shopping_cart for the user.
+
+        Both flags are computed as EXISTS subqueries, so a whole page
+        is resolved in the same query that fetches the recipes.
+        Anonymous users get the queryset back untouched.
+
+        Parameters:
+            user (User): The user the recipes are rendered for.
+
+        Returns:
+            RecipeQuerySet: The annotated queryset.
+
+        """
+        if not user.is_authenticated:
+            return self
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+        )
+
+    def for_read(self, user):
+        """
+        Return the queryset used to render recipes to the user.
+
+        Authors are joined while tags and ingredients are prefetched,
+        so rendering any number of recipes costs a constant number
+        of queries.
+
+        Parameters:
+            user (User): The user the recipes are rendered for.
+
+        Returns:
+            RecipeQuerySet: The read-optimized queryset.
+
+        """
+        return self.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredient_to_recipe',
+                queryset=IngredientRecipe.objects.select_related(
+                    'ingredient')
+            ),
+        ).annotate_user_flags(user)
+
+    def limit_per_author(self, limit):
+        """
+        Keep only the newest recipes of every author.
+
+        Recipes are ranked with ROW_NUMBER() partitioned by author in a
+        single query, so the top recipes of any number of authors are
+        fetched at once.
+
+        Parameters:
+            limit (int): The number of recipes to keep per author.
+
+        Returns:
+            RecipeQuerySet: The filtered queryset.
+
+        """
+        ranked = self.order_by().annotate(
+            row_number=Window(
+                expression=RowNumber(),
+                partition_by=[F('author_id')],
+                order_by=F('pub_date').desc(),
+            )
+        ).values('id', 'row_number')
+        sql, params = ranked.query.sql_with_params()
+        return self.filter(id__in=RawSQL(
+            f'SELECT ranked.id FROM ({sql}) ranked '
+            f'WHERE ranked.row_number <= %s',
+            (*params, limit)
+        ))
+
+
+class Recipe(CounterFieldsMixin, models.Model):
     """
     Represents a recipe created by a user.
     """
@@ -114,6 +201,12 @@ class Recipe(models.Model):
         upload_to='recipes/image/',
         verbose_name='Image'
     )
+    image_variants = models.JSONField(
+        verbose_name='Image Variants',
+        default=dict,
+        blank=True,
+        editable=False
+    )
     text = models.TextField(verbose_name='Description')
     ingredients = models.ManyToManyField(
         Ingredient,
@@ -141,6 +234,13 @@ class Recipe(models.Model):
         verbose_name='Publication Date',
         auto_now_add=True
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Favorites Count', default=0, editable=False)
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='In Carts Count', default=0, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
+    counter_fields = ('favorites_count', 'in_carts_count')
 
     class Meta:
         ordering = ('-pub_date',)
@@ -238,3 +338,169 @@ class IngredientRecipe(models.Model):
     def __str__(self):
         return f'{self.ingredient.name} - {self.amount} ' \
                f'{self.ingredient.measurement_unit}'
+
+
+class ShoppingListItem(models.Model):
+    """
+    Represents the total amount of an ingredient in a user's cart.
+
+    Rows are maintained incrementally whenever recipes are added to
+    or removed from the cart, or a recipe in the cart is edited.
+    Carts written around the services and the admin are repaired
+    by the rebuild_shopping_lists command.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='User',
+        related_name='shopping_list_items'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ingredient'
+    )
+    amount = models.PositiveIntegerField(verbose_name='Amount')
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_list_item'
+            )
+        ]
+        verbose_name = 'Shopping List Item'
+        verbose_name_plural = 'Shopping List Items'
+
+    def __str__(self):
+        return f'{self.user} - {self.ingredient} - {self.amount}'
+
+
+class SimilarRecipe(models.Model):
+    """
+    Represents a precomputed neighbour of a recipe.
+
+    Rows are written by the build_similar_recipes command, which
+    keeps the SIMILAR_RECIPES_COUNT most similar recipes of every
+    recipe ranked by cosine similarity.
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Recipe',
+        related_name='similar_recipes'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Similar Recipe',
+        related_name='similar_to'
+    )
+    rank = models.PositiveSmallIntegerField(verbose_name='Rank')
+    score = models.FloatField(verbose_name='Score')
+
+    class Meta:
+        ordering = ('recipe', 'rank')
+        constraints = [
+            UniqueConstraint(
+                fields=('recipe', 'rank'),
+                name='unique_similar_recipe_rank'
+            )
+        ]
+        verbose_name = 'Similar Recipe'
+        verbose_name_plural = 'Similar Recipes'
+
+    def __str__(self):
+        return f'{self.recipe} ~ {self.similar} ({self.score:.2f})'
+
+
+class CatalogBump:
+    """
+    Deferred bump of catalog versions, comparable so that a
+    transaction schedules each set of names only once. A bump that
+    already ran, as captured callbacks do in tests, no longer counts.
+
+    """
+
+    def __init__(self, names):
+        self.names = frozenset(names)
+        self.done = False
+
+    def __eq__(self, other):
+        return isinstance(other, CatalogBump) and self.names == other.names
+
+    def __call__(self):
+        self.done = True
+        CatalogVersion.bump(*self.names)
+
+
+class CatalogVersion(models.Model):
+    """
+    Represents the version of a group of tables served by the API.
+
+    Versions are bumped by signals whenever a row of the group is
+    written, and are used to validate cached responses.
+    """
+
+    RECIPES = 'recipes'
+    TAGS = 'tags'
+    INGREDIENTS = 'ingredients'
+    ACTIVITY = 'activity'
+    NAMES = (RECIPES, TAGS, INGREDIENTS, ACTIVITY)
+
+    name = models.CharField(
+        max_length=settings.LENGTH_RECIPES,
+        primary_key=True,
+        verbose_name='Name'
+    )
+    version = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Version'
+    )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Updated'
+    )
+
+    class Meta:
+        verbose_name = 'Catalog Version'
+        verbose_name_plural = 'Catalog Versions'
+
+    def __str__(self):
+        return f'{self.name} v{self.version}'
+
+    @classmethod
+    def bump(cls, *names):
+        """
+        Increment the versions of the named groups.
+
+        Parameters:
+            names (str): The names of the groups that changed.
+
+        """
+        cls.objects.filter(name__in=names).update(
+            version=F('version') + 1,
+            updated=timezone.now()
+        )
+
+    @classmethod
+    def bump_on_commit(cls, *names):
+        """
+        Bump the versions once the current transaction commits.
+
+        A bump of the same names already pending in the transaction
+        is not scheduled again, so writing many rows costs one update.
+
+        Parameters:
+            names (str): The names of the groups that changed.
+
+        """
+        bump = CatalogBump(names)
+        connection = transaction.get_connection()
+        if connection.in_atomic_block and any(
+                entry[1] == bump and not entry[1].done
+                for entry in connection.run_on_commit):
+            return
+        transaction.on_commit(bump)
@@ -0,0 +1,192 @@
+import re
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+SEARCH_TABLE = 'recipes_search'
+
+WORD = re.compile(r'\w+')
+
+
+class SearchBackend(ABC):
+    """
+    Full-text search over recipe names, descriptions and ingredients.
+
+    A backend keeps a search index next to the recipe table, updates
+    it for changed recipes and filters and ranks recipe querysets.
+    Backends are picked per database vendor from
+    RECIPE_SEARCH_BACKENDS.
+
+    """
+
+    def index(self, recipe_ids):
+        """
+        Rebuild the index entries of the recipes.
+
+        Parameters:
+            recipe_ids (iterable): The ids of written recipes.
+
+        """
+
+    def remove(self, recipe_ids):
+        """
+        Drop the index entries of deleted recipes.
+
+        """
+
+    @abstractmethod
+    def search(self, queryset, query):
+        """
+        Filter a recipe queryset by a search query.
+
+        Parameters:
+            queryset (QuerySet): The recipes to search.
+            query (str): The text entered by the user.
+
+        Returns:
+            QuerySet: The matching recipes annotated with search_rank
+            and ordered best match first.
+
+        """
+
+
+class BasicSearchBackend(SearchBackend):
+    """
+    Unindexed fallback matching every word with icontains.
+
+    """
+
+    def search(self, queryset, query):
+        for word in WORD.findall(query):
+            queryset = queryset.filter(
+                Q(name__icontains=word)
+                | Q(text__icontains=word)
+                | Q(ingredients__name__icontains=word)
+            )
+        return queryset.distinct().annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        ).order_by('-pub_date')
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Search over a tsvector column with a GIN index.
+
+    Names weigh more than ingredients, which weigh more than the
+    description, and words are stemmed with the configuration set
+    in RECIPE_SEARCH_CONFIG.
+
+    """
+
+    def index(self, recipe_ids):
+        recipe_ids = list(recipe_ids)
+        if not recipe_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (recipe_id, document) '
+                f'SELECT recipe.id, '
+                f"setweight(to_tsvector(%s, recipe.name), 'A') || "
+                f'setweight(to_tsvector(%s, coalesce('
+                f"string_agg(ingredient.name, ' '), '')), 'B') || "
+                f"setweight(to_tsvector(%s, recipe.text), 'C') "
+                f'FROM recipes_recipe recipe '
+                f'LEFT JOIN recipes_ingredientrecipe amount '
+                f'ON amount.recipe_id = recipe.id '
+                f'LEFT JOIN recipes_ingredient ingredient '
+                f'ON ingredient.id = amount.ingredient_id '
+                f'WHERE recipe.id = ANY(%s) GROUP BY recipe.id '
+                f'ON CONFLICT (recipe_id) '
+                f'DO UPDATE SET document = EXCLUDED.document',
+                (*[settings.RECIPE_SEARCH_CONFIG] * 3, recipe_ids)
+            )
+
+    def search(self, queryset, query):
+        tsquery = 'websearch_to_tsquery(%s, %s)'
+        params = (settings.RECIPE_SEARCH_CONFIG, query)
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT recipe_id FROM {SEARCH_TABLE} '
+            f'WHERE document @@ {tsquery}', params
+        )).annotate(search_rank=RawSQL(
+            f'SELECT ts_rank_cd(document, {tsquery}) FROM {SEARCH_TABLE} '
+            f'WHERE recipe_id = recipes_recipe.id', params,
+            output_field=FloatField()
+        )).order_by(F('search_rank').desc(), '-pub_date')
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """
+    Search over an FTS5 table keyed by the recipe id.
+
+    FTS5 has no Russian stemmer, so every word is matched as a
+    prefix; results are ranked by BM25 with the same column weights
+    as on PostgreSQL.
+
+    """
+
+    def index(self, recipe_ids):
+        recipe_ids = list(recipe_ids)
+        if not recipe_ids:
+            return
+        self.remove(recipe_ids)
+        placeholders = ', '.join(['%s'] * len(recipe_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} '
+                f'(rowid, name, ingredients, text) '
+                f'SELECT recipe.id, recipe.name, '
+                f"coalesce(group_concat(ingredient.name, ' '), ''), "
+                f'recipe.text '
+                f'FROM recipes_recipe recipe '
+                f'LEFT JOIN recipes_ingredientrecipe amount '
+                f'ON amount.recipe_id = recipe.id '
+                f'LEFT JOIN recipes_ingredient ingredient '
+                f'ON ingredient.id = amount.ingredient_id '
+                f'WHERE recipe.id IN ({placeholders}) GROUP BY recipe.id',
+                recipe_ids
+            )
+
+    def remove(self, recipe_ids):
+        recipe_ids = list(recipe_ids)
+        if not recipe_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(recipe_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} '
+                f'WHERE rowid IN ({placeholders})',
+                recipe_ids
+            )
+
+    def search(self, queryset, query):
+        match = ' '.join(
+            '"{}"*'.format(word) for word in WORD.findall(query))
+        if not match:
+            return queryset.none()
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s', (match,)
+        )).annotate(search_rank=RawSQL(
+            f'SELECT -bm25({SEARCH_TABLE}, 10.0, 4.0, 1.0) '
+            f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s '
+            f'AND rowid = recipes_recipe.id', (match,),
+            output_field=FloatField()
+        )).order_by(F('search_rank').desc(), '-pub_date')
+
+
+def get_search_backend():
+    """
+    Get the search backend of the default database.
+
+    Returns:
+        SearchBackend: The backend for the database vendor, or the
+        unindexed fallback.
+
+    """
+    path = settings.RECIPE_SEARCH_BACKENDS.get(
+        connection.vendor, 'recipes.search.BasicSearchBackend')
+    return import_string(path)()
@@ -0,0 +1,335 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Sum
+
+from users.models import User
+
+from .counters import counters_applied_in_bulk, shift_counters
+from .models import (CatalogVersion, Favorite, IngredientRecipe, Recipe,
+                     ShoppingCart, ShoppingListItem)
+
+
+def get_recipe_amounts(recipe_ids):
+    """
+    Get the total amount of every ingredient used by the recipes.
+
+    Parameters:
+        recipe_ids (iterable): The ids of the recipes.
+
+    Returns:
+        dict: Amounts keyed by ingredient id.
+
+    """
+    return dict(IngredientRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values('ingredient_id').annotate(
+        total=Sum('amount')
+    ).order_by().values_list('ingredient_id', 'total'))
+
+
+def apply_shopping_list_deltas(deltas):
+    """
+    Add amount deltas to the users' shopping list totals.
+
+    Rows that reach zero are deleted and missing rows are created, so
+    any change costs at most one select, insert, update and delete.
+
+    Parameters:
+        deltas (dict): Amount changes keyed by (user id, ingredient id).
+
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    with transaction.atomic(savepoint=False):
+        items = {
+            (item.user_id, item.ingredient_id): item
+            for item in ShoppingListItem.objects.select_for_update().filter(
+                user_id__in={user_id for user_id, _ in deltas},
+                ingredient_id__in={
+                    ingredient_id for _, ingredient_id in deltas},
+            )
+        }
+        created, updated, deleted = [], [], []
+        for (user_id, ingredient_id), delta in deltas.items():
+            item = items.get((user_id, ingredient_id))
+            if item is None:
+                if delta > 0:
+                    created.append(ShoppingListItem(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        amount=delta,
+                    ))
+                continue
+            item.amount += delta
+            if item.amount > 0:
+                updated.append(item)
+            else:
+                deleted.append(item.pk)
+        ShoppingListItem.objects.bulk_create(created)
+        ShoppingListItem.objects.bulk_update(updated, ('amount',))
+        ShoppingListItem.objects.filter(pk__in=deleted).delete()
+
+
+def shift_shopping_list(user, recipe_ids, sign):
+    apply_shopping_list_deltas({
+        (user.id, ingredient_id): sign * amount
+        for ingredient_id, amount in get_recipe_amounts(recipe_ids).items()
+    })
+
+
+def add_to_shopping_list(user, recipe_ids):
+    """
+    Add the ingredients of the recipes to the user's shopping list.
+
+    Parameters:
+        user (User): The owner of the shopping cart.
+        recipe_ids (iterable): The ids of the recipes added to the cart.
+
+    """
+    shift_shopping_list(user, recipe_ids, 1)
+
+
+def remove_from_shopping_list(user, recipe_ids):
+    """
+    Remove the ingredients of the recipes from the user's shopping list.
+
+    Parameters:
+        user (User): The owner of the shopping cart.
+        recipe_ids (iterable): The ids of the recipes removed
+        from the cart.
+
+    """
+    shift_shopping_list(user, recipe_ids, -1)
+
+
+def update_shopping_lists(recipe, old_amounts, new_amounts):
+    """
+    Propagate a change of recipe ingredients to the carts holding it.
+
+    Parameters:
+        recipe (Recipe): The edited recipe.
+        old_amounts (dict): Amounts by ingredient id before the edit.
+        new_amounts (dict): Amounts by ingredient id after the edit.
+
+    """
+    changes = {
+        ingredient_id: (
+            new_amounts.get(ingredient_id, 0)
+            - old_amounts.get(ingredient_id, 0)
+        )
+        for ingredient_id in {*old_amounts, *new_amounts}
+    }
+    changes = {
+        ingredient_id: delta for ingredient_id, delta in changes.items()
+        if delta
+    }
+    if not changes:
+        return
+    user_ids = ShoppingCart.objects.filter(
+        recipe=recipe).values_list('user_id', flat=True)
+    apply_shopping_list_deltas({
+        (user_id, ingredient_id): delta
+        for user_id in user_ids
+        for ingredient_id, delta in changes.items()
+    })
+
+
+def get_cart_totals(user_ids=None):
+    """
+    Sum the ingredients of the recipes in the users' carts.
+
+    Parameters:
+        user_ids (iterable): The users to sum, every user by default.
+
+    Returns:
+        dict: Amounts by (user id, ingredient id).
+
+    """
+    queryset = ShoppingCart.objects.all()
+    if user_ids is not None:
+        queryset = queryset.filter(user_id__in=user_ids)
+    totals = defaultdict(int)
+    for user_id, ingredient_id, amount in queryset.values_list(
+        'user_id', 'recipe__ingredient_to_recipe__ingredient_id',
+        'recipe__ingredient_to_recipe__amount'
+    ).iterator():
+        if ingredient_id is not None:
+            totals[user_id, ingredient_id] += amount
+    return totals
+
+
+def find_shopping_list_drift():
+    """
+    Get the users whose stored shopping list differs from their cart.
+
+    Returns:
+        set: The ids of the drifted users.
+
+    """
+    expected = get_cart_totals()
+    stored = {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount
+        in ShoppingListItem.objects.values_list(
+            'user_id', 'ingredient_id', 'amount').iterator()
+    }
+    return {
+        user_id
+        for (user_id, _), _ in expected.items() ^ stored.items()
+    }
+
+
+def rebuild_shopping_lists(user_ids):
+    """
+    Recompute the shopping list totals of the users from their carts.
+
+    Parameters:
+        user_ids (iterable): The ids of the users to rebuild.
+
+    """
+    user_ids = set(user_ids)
+    totals = get_cart_totals(user_ids)
+    with transaction.atomic():
+        ShoppingListItem.objects.filter(user_id__in=user_ids).delete()
+        ShoppingListItem.objects.bulk_create(
+            (
+                ShoppingListItem(
+                    user_id=user_id, ingredient_id=ingredient_id,
+                    amount=amount
+                )
+                for (user_id, ingredient_id), amount in totals.items()
+            ),
+            batch_size=1000
+        )
+
+
+def lock_user(user):
+    """
+    Lock the user's row until the current transaction ends.
+
+    Concurrent cart and favorite writes of the same user, such as a
+    double-clicked button, wait for each other, so each reads the
+    rows the other one wrote and none is counted twice.
+
+    """
+    User.objects.select_for_update().only('pk').get(pk=user.pk)
+
+
+def add_to_cart(user, recipe_ids):
+    """
+    Add the recipes to the user's shopping cart.
+
+    Recipes that do not exist or are already in the cart are skipped.
+
+    Parameters:
+        user (User): The owner of the shopping cart.
+        recipe_ids (iterable): The ids of the recipes to add.
+
+    Returns:
+        list: The ids of the recipes that were added.
+
+    """
+    with transaction.atomic():
+        lock_user(user)
+        added = list(Recipe.objects.filter(id__in=recipe_ids).exclude(
+            shopping_list__user=user).values_list('id', flat=True))
+        ShoppingCart.objects.bulk_create(
+            (ShoppingCart(user=user, recipe_id=recipe_id)
+             for recipe_id in added),
+            ignore_conflicts=True
+        )
+        add_to_shopping_list(user, added)
+        if added:
+            shift_counters(
+                Recipe.objects.filter(id__in=added), in_carts_count=1)
+            CatalogVersion.bump_on_commit(CatalogVersion.ACTIVITY)
+    return added
+
+
+def remove_from_cart(user, recipe_ids=None):
+    """
+    Remove the recipes from the user's shopping cart.
+
+    Parameters:
+        user (User): The owner of the shopping cart.
+        recipe_ids (iterable): The ids of the recipes to remove,
+        the whole cart when omitted.
+
+    Returns:
+        list: The ids of the recipes that were removed.
+
+    """
+    cart = ShoppingCart.objects.filter(user=user)
+    if recipe_ids is not None:
+        cart = cart.filter(recipe_id__in=recipe_ids)
+    with transaction.atomic():
+        lock_user(user)
+        removed = list(cart.values_list('recipe_id', flat=True))
+        if not removed:
+            return removed
+        with counters_applied_in_bulk():
+            cart.delete()
+        shift_counters(
+            Recipe.objects.filter(id__in=removed), in_carts_count=-1)
+        if recipe_ids is None:
+            ShoppingListItem.objects.filter(user=user).delete()
+        else:
+            remove_from_shopping_list(user, removed)
+    return removed
+
+
+def copy_favorites_to_cart(user):
+    """
+    Add every favorite recipe of the user to their shopping cart.
+
+    Returns:
+        list: The ids of the recipes that were added.
+
+    """
+    return add_to_cart(
+        user, Favorite.objects.filter(user=user).values('recipe_id'))
+
+
+def add_to_favorites(user, recipe_ids):
+    """
+    Add the recipes to the user's favorites.
+
+    Returns:
+        list: The ids of the recipes that were added.
+
+    """
+    with transaction.atomic():
+        lock_user(user)
+        added = list(Recipe.objects.filter(id__in=recipe_ids).exclude(
+            favorites__user=user).values_list('id', flat=True))
+        Favorite.objects.bulk_create(
+            (Favorite(user=user, recipe_id=recipe_id) for recipe_id in added),
+            ignore_conflicts=True
+        )
+        if added:
+            shift_counters(
+                Recipe.objects.filter(id__in=added), favorites_count=1)
+            CatalogVersion.bump_on_commit(CatalogVersion.ACTIVITY)
+    return added
+
+
+def remove_from_favorites(user, recipe_ids):
+    """
+    Remove the recipes from the user's favorites.
+
+    Returns:
+        list: The ids of the recipes that were removed.
+
+    """
+    favorites = Favorite.objects.filter(user=user, recipe_id__in=recipe_ids)
+    with transaction.atomic():
+        lock_user(user)
+        removed = list(favorites.values_list('recipe_id', flat=True))
+        if removed:
+            with counters_applied_in_bulk():
+                favorites.delete()
+            shift_counters(
+                Recipe.objects.filter(id__in=removed), favorites_count=-1)
+    return removed
@@ -0,0 +1,173 @@
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from users.models import Follow, User
+
+from .cook_with_index import cook_with_index
+from .counters import counters_suspended, shift_counters
+from .images import schedule_variants
+from .ingredient_index import ingredient_index
+from .models import (CatalogVersion, Favorite, Ingredient, IngredientRecipe,
+                     Recipe, ShoppingCart, Tag)
+from .search import get_search_backend
+from .services import get_recipe_amounts, update_shopping_lists
+
+VERSIONED_MODELS = {
+    Recipe: (CatalogVersion.RECIPES,),
+    IngredientRecipe: (CatalogVersion.RECIPES,),
+    Recipe.tags.through: (CatalogVersion.RECIPES,),
+    Tag: (CatalogVersion.TAGS, CatalogVersion.RECIPES),
+    Ingredient: (CatalogVersion.INGREDIENTS, CatalogVersion.RECIPES),
+    User: (CatalogVersion.RECIPES,),
+    Favorite: (CatalogVersion.ACTIVITY,),
+    ShoppingCart: (CatalogVersion.ACTIVITY,),
+    Follow: (CatalogVersion.ACTIVITY,),
+}
+
+# Counted model: (counter model, foreign key attribute, counter column).
+COUNTED_MODELS = {
+    Favorite: ((Recipe, 'recipe_id', 'favorites_count'),),
+    ShoppingCart: ((Recipe, 'recipe_id', 'in_carts_count'),),
+    Follow: (
+        (User, 'author_id', 'followers_count'),
+        (User, 'user_id', 'following_count'),
+    ),
+    Recipe: ((User, 'author_id', 'recipes_count'),),
+}
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_index(**kwargs):
+    """
+    Drop the ingredient autocomplete index when an ingredient changes.
+
+    """
+    ingredient_index.invalidate()
+
+
+@receiver(post_save, sender=Recipe)
+def build_image_variants(instance, raw=False, **kwargs):
+    """
+    Generate the image variants when a recipe gets a new image.
+
+    The images are encoded by a background worker once the
+    transaction commits, so neither the write nor the response waits
+    for them. Fixture loads are skipped; their images are backfilled
+    by build_image_variants.
+
+    """
+    variants = instance.image_variants or {}
+    if raw or not instance.image or (
+            variants.get('source') == instance.image.name):
+        return
+    recipe_id = instance.pk
+    transaction.on_commit(lambda: schedule_variants(recipe_id))
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe(instance, **kwargs):
+    """
+    Reindex a written recipe for search once the transaction commits.
+
+    Its ingredients are written after the recipe row in the same
+    transaction, so indexing waits for the commit to see them.
+
+    """
+    recipe_ids = [instance.pk]
+    transaction.on_commit(lambda: get_search_backend().index(recipe_ids))
+    transaction.on_commit(lambda: cook_with_index.update(recipe_ids))
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_recipe(instance, **kwargs):
+    recipe_ids = [instance.pk]
+    transaction.on_commit(lambda: get_search_backend().remove(recipe_ids))
+    transaction.on_commit(lambda: cook_with_index.update(recipe_ids))
+
+
+@receiver(post_delete, sender=Ingredient)
+def invalidate_cook_with_index(**kwargs):
+    """
+    Drop the cook-with index when a deleted ingredient cascades
+    to the recipes using it.
+
+    """
+    cook_with_index.invalidate()
+
+
+@receiver(post_save, sender=Ingredient)
+def reindex_ingredient_recipes(instance, created=False, **kwargs):
+    """
+    Reindex the recipes using a renamed ingredient.
+
+    """
+    if created:
+        return
+    recipe_ids = list(IngredientRecipe.objects.filter(
+        ingredient=instance).values_list('recipe_id', flat=True))
+    transaction.on_commit(lambda: get_search_backend().index(recipe_ids))
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_recipe_from_shopping_lists(instance, **kwargs):
+    """
+    Subtract a deleted recipe from the shopping lists holding it.
+
+    Runs before the cascade removes the recipe's ingredients.
+
+    """
+    update_shopping_lists(instance, get_recipe_amounts([instance.pk]), {})
+
+
+def bump_catalog_versions(sender, update_fields=None, action='post_',
+                          **kwargs):
+    """
+    Bump the catalog versions a written model belongs to.
+
+    The bump runs once the transaction commits, so clients never
+    validate against a version whose rows are still being written,
+    and only once however many rows the transaction writes.
+    Saves that only touch last_login are ignored.
+
+    """
+    if not action.startswith('post_'):
+        return
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    CatalogVersion.bump_on_commit(*VERSIONED_MODELS[sender])
+
+
+def update_counters(sender, instance, signal, created=False, raw=False,
+                    **kwargs):
+    """
+    Shift the counters a created or deleted row is counted in.
+
+    Every counter is moved by a single atomic UPDATE, which runs in
+    the transaction of the write when there is one. Bulk writes
+    suspend this receiver and shift the counters themselves, and
+    fixtures already carry the counters of the rows they load.
+
+    """
+    if raw or counters_suspended() or (
+            signal is post_save and not created):
+        return
+    delta = 1 if signal is post_save else -1
+    for model, attribute, counter in COUNTED_MODELS[sender]:
+        shift_counters(
+            model.objects.filter(pk=getattr(instance, attribute)),
+            **{counter: delta}
+        )
+
+
+for model in VERSIONED_MODELS:
+    if model is Recipe.tags.through:
+        m2m_changed.connect(bump_catalog_versions, sender=model)
+        continue
+    post_save.connect(bump_catalog_versions, sender=model)
+    post_delete.connect(bump_catalog_versions, sender=model)
+
+for model in COUNTED_MODELS:
+    post_save.connect(update_counters, sender=model)
+    post_delete.connect(update_counters, sender=model)
@@ -0,0 +1,181 @@
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from scipy import sparse
+
+from .models import IngredientRecipe, Recipe, SimilarRecipe
+
+
+def load_pairs(queryset, recipe_ids):
+    """
+    Load (recipe id, feature id) pairs of existing recipes.
+
+    Returns:
+        ndarray: The unique pairs as an (n, 2) array.
+
+    """
+    pairs = np.array(list(queryset), dtype=np.int64).reshape(-1, 2)
+    pairs = pairs[np.isin(pairs[:, 0], recipe_ids)]
+    return np.unique(pairs, axis=0)
+
+
+def build_matrix():
+    """
+    Build the TF-IDF weighted recipe by feature matrix.
+
+    Every ingredient and every tag is a binary feature, tags scaled
+    by SIMILAR_RECIPES_TAG_WEIGHT. Features are weighted by their
+    smoothed inverse document frequency, so ubiquitous ingredients
+    such as salt barely count, and rows are L2-normalized, so the
+    product of two rows is their cosine similarity.
+
+    Returns:
+        tuple: The sorted recipe ids and the CSR matrix whose rows
+        follow them.
+
+    """
+    recipe_ids = np.array(
+        Recipe.objects.order_by('id').values_list('id', flat=True),
+        dtype=np.int64
+    )
+    if not len(recipe_ids):
+        return recipe_ids, sparse.csr_matrix((0, 0))
+    feature_sets = (
+        (IngredientRecipe.objects.order_by().values_list(
+            'recipe_id', 'ingredient_id'), 1.0),
+        (Recipe.tags.through.objects.order_by().values_list(
+            'recipe_id', 'tag_id'), settings.SIMILAR_RECIPES_TAG_WEIGHT),
+    )
+    rows, columns, weights = [], [], []
+    offset = 0
+    for queryset, weight in feature_sets:
+        pairs = load_pairs(queryset, recipe_ids)
+        features, feature_columns = np.unique(
+            pairs[:, 1], return_inverse=True)
+        rows.append(np.searchsorted(recipe_ids, pairs[:, 0]))
+        columns.append(feature_columns.reshape(-1) + offset)
+        weights.append(np.full(len(pairs), weight))
+        offset += len(features)
+    matrix = sparse.csr_matrix(
+        (np.concatenate(weights),
+         (np.concatenate(rows), np.concatenate(columns))),
+        shape=(len(recipe_ids), offset)
+    )
+    document_frequency = np.bincount(matrix.indices, minlength=offset)
+    idf = np.log((1 + len(recipe_ids)) / (1 + document_frequency)) + 1
+    matrix = matrix @ sparse.diags(idf)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1))).ravel()
+    norms[norms == 0] = 1
+    return recipe_ids, (sparse.diags(1 / norms) @ matrix).tocsr()
+
+
+def find_neighbours(matrix, positions, count):
+    """
+    Find the most similar rows of every requested row.
+
+    Similarities of a batch of rows to all rows are computed with one
+    sparse matrix product, and the top of every row is selected with
+    np.argpartition instead of a full sort.
+
+    Parameters:
+        matrix (csr_matrix): The normalized feature matrix.
+        positions (ndarray): The rows to find neighbours for.
+        count (int): The number of neighbours per row.
+
+    Yields:
+        tuple: The row, its neighbour rows and their similarities,
+        most similar first, newer recipes first on ties.
+
+    """
+    transposed = matrix.T.tocsr()
+    batch_size = settings.SIMILAR_RECIPES_BATCH_SIZE
+    for start in range(0, len(positions), batch_size):
+        batch = positions[start:start + batch_size]
+        scores = (matrix[batch] @ transposed).tocsr()
+        for offset, position in enumerate(batch):
+            row = slice(scores.indptr[offset], scores.indptr[offset + 1])
+            neighbours = scores.indices[row]
+            similarities = scores.data[row]
+            keep = (neighbours != position) & (similarities > 0)
+            neighbours, similarities = neighbours[keep], similarities[keep]
+            if len(similarities) > count:
+                top = np.argpartition(-similarities, count)[:count]
+                neighbours, similarities = neighbours[top], similarities[top]
+            order = np.lexsort((-neighbours, -similarities))
+            yield position, neighbours[order], similarities[order]
+
+
+def write_neighbours(recipe_ids, matrix, positions, count):
+    """
+    Replace the stored neighbours of the recipes at the positions.
+
+    Every batch is written in its own transaction, so readers never
+    see a recipe without neighbours.
+
+    Returns:
+        set: The ids of every neighbour written.
+
+    """
+    written = set()
+    batch_size = settings.SIMILAR_RECIPES_BATCH_SIZE
+    for start in range(0, len(positions), batch_size):
+        batch = positions[start:start + batch_size]
+        rows = []
+        for position, neighbours, similarities in find_neighbours(
+                matrix, batch, count):
+            neighbour_ids = recipe_ids[neighbours].tolist()
+            written.update(neighbour_ids)
+            rows.extend(
+                SimilarRecipe(
+                    recipe_id=int(recipe_ids[position]),
+                    similar_id=neighbour_id,
+                    rank=rank,
+                    score=float(similarity),
+                )
+                for rank, (neighbour_id, similarity) in enumerate(
+                    zip(neighbour_ids, similarities), 1)
+            )
+        with transaction.atomic():
+            SimilarRecipe.objects.filter(
+                recipe_id__in=recipe_ids[batch].tolist()).delete()
+            SimilarRecipe.objects.bulk_create(rows)
+    return written
+
+
+def update_similar_recipes(recipe_ids=None, count=None):
+    """
+    Recompute the similar recipes of some or all recipes.
+
+    An incremental update also recomputes the recipes that listed the
+    given ones and the recipes the given ones are now similar to, so
+    new and edited recipes enter and leave their neighbours' lists.
+
+    Parameters:
+        recipe_ids (iterable): The recipes to update, all when omitted.
+        count (int): The number of neighbours kept per recipe.
+
+    Returns:
+        int: The number of recipes updated.
+
+    """
+    count = count or settings.SIMILAR_RECIPES_COUNT
+    all_ids, matrix = build_matrix()
+    if recipe_ids is None:
+        write_neighbours(all_ids, matrix, np.arange(len(all_ids)), count)
+        return len(all_ids)
+
+    def positions_of(ids):
+        ids = np.array(sorted(ids), dtype=np.int64)
+        positions = np.searchsorted(all_ids, ids)
+        found = positions < len(all_ids)
+        found[found] = all_ids[positions[found]] == ids[found]
+        return positions[found]
+
+    recipe_ids = set(recipe_ids)
+    affected = recipe_ids | set(SimilarRecipe.objects.filter(
+        similar_id__in=recipe_ids).values_list('recipe_id', flat=True))
+    positions = positions_of(affected)
+    neighbours = write_neighbours(all_ids, matrix, positions, count)
+    extra = positions_of(neighbours - affected)
+    write_neighbours(all_ids, matrix, extra, count)
+    return len(positions) + len(extra)
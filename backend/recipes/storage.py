@@ -0,0 +1,81 @@
+import hashlib
+import os
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage naming files by the SHA-256 of their content.
+
+    A file saved as 'recipes/image/photo.JPG' is stored as
+    'recipes/image/ab/cd/abcd....jpg'. Identical uploads map to the
+    same name and are written once, the two-level sharding keeps
+    directories small, and since a name never changes its content,
+    the files can be served with an immutable Cache-Control header.
+
+    Attributes:
+        content_addressed (bool): Marks storages whose files may be
+        shared by several records and must not be deleted per record.
+
+    """
+    content_addressed = True
+
+    def get_content_name(self, name, content):
+        """
+        Build the sharded content-hash name of a file.
+
+        Parameters:
+            name (str): The name the file was saved under.
+            content (File): The file content.
+
+        Returns:
+            str: The content-addressed name in the same directory.
+
+        """
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        content_hash = digest.hexdigest()
+        if os.path.splitext(os.path.basename(name))[0] == content_hash:
+            return name
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(
+            directory, content_hash[:2], content_hash[2:4],
+            f'{content_hash}{extension}'
+        )
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        return super().save(
+            self.get_content_name(name, content), content, max_length)
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        """
+        Write the file unless a file with the same content exists.
+
+        The content is written under a unique temporary name and then
+        renamed over the content name, so concurrent identical uploads
+        never collide and readers never see a partial file.
+
+        """
+        if self.exists(name):
+            return name
+        temp_name = super()._save(f'{name}.{uuid.uuid4().hex}.tmp', content)
+        os.replace(self.path(temp_name), self.path(name))
+        return name
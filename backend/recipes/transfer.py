@@ -0,0 +1,286 @@
+import base64
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import Max, Prefetch
+from django.utils.dateparse import parse_datetime
+
+from users.models import User
+
+from .cook_with_index import cook_with_index
+from .counters import recount
+from .models import CatalogVersion, Ingredient, IngredientRecipe, Recipe, Tag
+from .search import get_search_backend
+
+
+class TransferConflict(ValueError):
+    """
+    Raised when an imported row clashes with a different stored row.
+
+    """
+
+
+def bulk_create_with_ids(model, objs):
+    """
+    Insert the objects in one statement and make sure they get ids.
+
+    Backends that cannot return ids from a bulk insert get ids
+    assigned upfront from the current maximum. On SQLite the table
+    is write-locked first, so a concurrent writer waits for the
+    transaction instead of taking the same ids; other such backends
+    must not be written by anything else during an import. Must be
+    called inside a transaction.
+
+    Parameters:
+        model (Model): The model class.
+        objs (list): Unsaved instances of the model.
+
+    Returns:
+        list: The saved instances with their primary keys set.
+
+    """
+    if objs and not connection.features.can_return_rows_from_bulk_insert:
+        if connection.vendor == 'sqlite':
+            # Any write statement takes the database write lock.
+            table = connection.ops.quote_name(model._meta.db_table)
+            column = connection.ops.quote_name(model._meta.pk.column)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'UPDATE {table} SET {column} = {column} WHERE 0')
+        next_id = (model.objects.aggregate(
+            last_id=Max('pk'))['last_id'] or 0) + 1
+        for offset, obj in enumerate(objs):
+            obj.pk = next_id + offset
+    return model.objects.bulk_create(objs)
+
+
+def iter_recipe_batches(batch_size):
+    """
+    Yield every recipe with its relations in id-ordered batches.
+
+    Batches are fetched by keyset, so memory stays bounded by the
+    batch size however large the table is.
+
+    """
+    last_id = 0
+    while True:
+        batch = list(Recipe.objects.filter(id__gt=last_id).order_by(
+            'id'
+        ).select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredient_to_recipe',
+                IngredientRecipe.objects.select_related('ingredient')
+            )
+        )[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].id
+
+
+def export_recipe(recipe, embed_images=False):
+    """
+    Represent a recipe as a self-contained JSON object.
+
+    Parameters:
+        recipe (Recipe): The recipe with its relations prefetched.
+        embed_images (bool): Include the image bytes as base64
+        instead of only the media path.
+
+    Returns:
+        dict: The recipe, its author, tags and ingredients.
+
+    """
+    image = {'name': recipe.image.name}
+    if embed_images and recipe.image:
+        with recipe.image.open('rb') as file:
+            image['data'] = base64.b64encode(file.read()).decode()
+    return {
+        'id': recipe.id,
+        'name': recipe.name,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+        'pub_date': recipe.pub_date.isoformat(),
+        'image': image,
+        'author': {
+            'email': recipe.author.email,
+            'username': recipe.author.username,
+            'first_name': recipe.author.first_name,
+            'last_name': recipe.author.last_name,
+        },
+        'tags': [
+            {'name': tag.name, 'color': tag.color, 'slug': tag.slug}
+            for tag in recipe.tags.all()
+        ],
+        'ingredients': [
+            {
+                'name': item.ingredient.name,
+                'measurement_unit': item.ingredient.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in recipe.ingredient_to_recipe.all()
+        ],
+    }
+
+
+def read_batches(lines, batch_size):
+    """
+    Group the lines of a JSONL stream into batches.
+
+    """
+    lines = iter(lines)
+    while True:
+        batch = list(islice(lines, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+@transaction.atomic
+def import_recipes(rows):
+    """
+    Import a batch of exported recipes in one transaction.
+
+    Authors are matched by email, tags by name and ingredients by
+    name and measurement unit; missing ones are created, unless their
+    username or color belongs to another row. Each model
+    is written with a single bulk insert, and pub_date, which
+    auto_now_add overrides on insert, is restored afterwards. Bulk
+    inserts send no signals, so the authors' counters are recounted
+    and the recipes are indexed for search and cook-with explicitly.
+
+    Parameters:
+        rows (list): Exported recipe dicts.
+
+    Returns:
+        list: The created recipes.
+
+    Raises:
+        TransferConflict: A new author or tag clashes with another one.
+
+    """
+    authors = resolve_authors([row['author'] for row in rows])
+    tags = resolve_tags([tag for row in rows for tag in row['tags']])
+    ingredients = resolve_ingredients(
+        [item for row in rows for item in row['ingredients']])
+
+    recipes = bulk_create_with_ids(Recipe, [
+        Recipe(
+            author=authors[row['author']['email']],
+            name=row['name'],
+            text=row['text'],
+            cooking_time=row['cooking_time'],
+            image=import_image(row['image']),
+        )
+        for row in rows
+    ])
+    for recipe, row in zip(recipes, rows):
+        recipe.pub_date = parse_datetime(row['pub_date'])
+    Recipe.objects.bulk_update(recipes, ('pub_date',))
+
+    recipe_tag = Recipe.tags.through
+    recipe_tag.objects.bulk_create(
+        recipe_tag(recipe_id=recipe.id, tag_id=tags[tag['name']].id)
+        for recipe, row in zip(recipes, rows)
+        for tag in row['tags']
+    )
+    IngredientRecipe.objects.bulk_create(
+        IngredientRecipe(
+            recipe=recipe,
+            ingredient=ingredients[
+                (item['name'], item['measurement_unit'])],
+            amount=item['amount'],
+        )
+        for recipe, row in zip(recipes, rows)
+        for item in row['ingredients']
+    )
+    recount(User, {recipe.author_id for recipe in recipes})
+    recipe_ids = [recipe.id for recipe in recipes]
+    transaction.on_commit(lambda: get_search_backend().index(recipe_ids))
+    transaction.on_commit(lambda: cook_with_index.update(recipe_ids))
+    CatalogVersion.bump_on_commit(*CatalogVersion.NAMES)
+    return recipes
+
+
+def check_unique(model, objs, fields):
+    """
+    Make sure new rows take no unique value of another row.
+
+    Parameters:
+        model (Model): The model class.
+        objs (list): Unsaved instances of the model.
+        fields (tuple): Unique fields other than the one matched on.
+
+    Raises:
+        TransferConflict: A value is taken by a stored row or by
+        another new one.
+
+    """
+    for field in fields:
+        values = [getattr(obj, field) for obj in objs]
+        taken = set(model.objects.filter(
+            **{f'{field}__in': values}).values_list(field, flat=True))
+        for value in values:
+            if value in taken:
+                raise TransferConflict(
+                    f'{model._meta.verbose_name} with {field} '
+                    f'{value!r} already exists'
+                )
+            taken.add(value)
+
+
+def resolve_authors(rows):
+    wanted = {row['email']: row for row in rows}
+    found = User.objects.in_bulk(wanted, field_name='email')
+    missing = [
+        User(password=make_password(None), **row)
+        for email, row in wanted.items() if email not in found
+    ]
+    check_unique(User, missing, ('username',))
+    found.update(
+        (user.email, user) for user in bulk_create_with_ids(User, missing))
+    return found
+
+
+def resolve_tags(rows):
+    wanted = {row['name']: row for row in rows}
+    found = Tag.objects.in_bulk(wanted, field_name='name')
+    missing = [
+        Tag(**row) for name, row in wanted.items() if name not in found]
+    check_unique(Tag, missing, ('color',))
+    found.update(
+        (tag.name, tag) for tag in bulk_create_with_ids(Tag, missing))
+    return found
+
+
+def resolve_ingredients(rows):
+    wanted = {(row['name'], row['measurement_unit']) for row in rows}
+    found = {
+        (ingredient.name, ingredient.measurement_unit): ingredient
+        for ingredient in Ingredient.objects.filter(
+            name__in={name for name, _ in wanted})
+        if (ingredient.name, ingredient.measurement_unit) in wanted
+    }
+    missing = [
+        Ingredient(name=name, measurement_unit=measurement_unit)
+        for name, measurement_unit in wanted - found.keys()
+    ]
+    found.update(
+        ((ingredient.name, ingredient.measurement_unit), ingredient)
+        for ingredient in bulk_create_with_ids(Ingredient, missing)
+    )
+    return found
+
+
+def import_image(image):
+    """
+    Get the media name of an exported image, saving embedded bytes.
+
+    """
+    if 'data' not in image:
+        return image['name']
+    return Recipe.image.field.storage.save(
+        image['name'], ContentFile(base64.b64decode(image['data'])))
@@ -1,6 +1,10 @@
 from django.contrib import admin
 
+from recipes.admin import RecountOnChangeMixin
+
+from .admin_filters import input_filter
 from .models import Follow, User
+from .paginators import EstimatedCountPaginator
 
 
 class UserAdmin(admin.ModelAdmin):
@@ -8,21 +12,32 @@ class UserAdmin(admin.ModelAdmin):
     Admin configuration for User model.
     """
 
-    list_display = ('username', 'email', 'first_name', 'last_name')
+    list_display = ('username', 'email', 'first_name', 'last_name',
+                    'recipes_count', 'followers_count')
     search_fields = ('username', 'email')
-    list_filter = ('first_name', 'last_name')
+    list_filter = ('is_staff', 'is_active')
     ordering = ('username',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-empty-'
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(RecountOnChangeMixin, admin.ModelAdmin):
     """
     Admin configuration for Follow model.
     """
 
     list_display = ('user', 'author')
-    list_filter = ('user', 'author')
-    ordering = ('user',)
+    list_select_related = ('user', 'author')
+    list_filter = (
+        input_filter('user__username', 'user'),
+        input_filter('author__username', 'author'),
+    )
+    search_fields = ('user__username', 'author__username')
+    autocomplete_fields = ('user', 'author')
+    recounted_fields = {'user': User, 'author': User}
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-empty-'
 
 
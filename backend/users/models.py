@@ -5,7 +5,31 @@ from django.db import models
 from django.db.models import F, Q, UniqueConstraint
 
 
-class User(AbstractUser):
+class CounterFieldsMixin:
+    """
+    Keep full saves from overwriting denormalized counters.
+
+    Counters are only changed by atomic UPDATE statements, so a save
+    of a loaded instance writes every field except them, and a stale
+    in-memory value never replaces a concurrent increment.
+
+    Attributes:
+        counter_fields (tuple): Names of the counter columns.
+
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(CounterFieldsMixin, AbstractUser):
     """
     Custom user model representing a user of the application.
     """
@@ -24,6 +48,14 @@ class User(AbstractUser):
     username = models.CharField(verbose_name='Username',
                                 max_length=settings.LENGTH_USERS,
                                 unique=True)
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Recipes Count', default=0, editable=False)
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Followers Count', default=0, editable=False)
+    following_count = models.PositiveIntegerField(
+        verbose_name='Following Count', default=0, editable=False)
+
+    counter_fields = ('recipes_count', 'followers_count', 'following_count')
 
     class Meta:
         ordering = ('username',)
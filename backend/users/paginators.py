@@ -0,0 +1,74 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class CachedCountPaginator(Paginator):
+    """
+        Paginator that caches the total number of objects.
+
+        The count is keyed by the SQL of the queryset and an optional
+        version of the data behind it, and kept for
+        PAGINATION_COUNT_CACHE_TIMEOUT seconds, so paging through the
+        same listing runs COUNT(*) only once. Without a version, the
+        count can be stale for up to that long after a write.
+
+        Attributes:
+            version (str): Changes whenever the counted rows may have.
+        """
+
+    def __init__(self, *args, version='', **kwargs):
+        super().__init__(*args, **kwargs)
+        self.version = version
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None:
+            return super().count
+        key = 'pagination-count:{}:{}'.format(
+            self.version, md5(str(query).encode()).hexdigest())
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, settings.PAGINATION_COUNT_CACHE_TIMEOUT)
+        return count
+
+
+class EstimatedCountPaginator(CachedCountPaginator):
+    """
+        Paginator using the planner estimate for large unfiltered tables.
+
+        On PostgreSQL an unfiltered queryset is counted from
+        pg_class.reltuples, which is read in constant time; the exact,
+        cached count is used when the estimate is below
+        ADMIN_ESTIMATED_COUNT_THRESHOLD, on other databases and for
+        filtered querysets.
+        """
+
+    @cached_property
+    def count(self):
+        estimate = self.get_estimate()
+        if estimate is not None and (
+                estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD):
+            return estimate
+        return super().count
+
+    def get_estimate(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None or query.where or query.distinct:
+            return None
+        connection = connections[self.object_list.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s',
+                (self.object_list.model._meta.db_table,)
+            )
+            row = cursor.fetchone()
+        return int(row[0]) if row else None